@@ -2,6 +2,8 @@
 Configuration management for the Argument Clinic backend.
 """
 
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -15,6 +17,7 @@ class Settings(BaseSettings):
     log_level: str = "INFO"
     debug: bool = False
     environment: str = "development"
+    uvicorn_workers: int = Field(default=1, ge=1)
 
     # AI Provider Configuration
     openai_api_key: str | None = None
@@ -30,7 +33,7 @@ class Settings(BaseSettings):
     # Session Configuration
     max_session_minutes: int = 5
     session_cleanup_interval: int = 300  # seconds
-    max_concurrent_sessions: int = 100
+    max_concurrent_sessions: int = Field(default=100, ge=1)  # oldest idle session evicted beyond this
 
     # Voice Configuration
     audio_threshold: float = Field(default=0.07, ge=0.0, le=1.0)
@@ -38,6 +41,14 @@ class Settings(BaseSettings):
     min_recording_duration: float = Field(default=0.5, ge=0.1, le=5.0)
     max_concurrent_audio_tasks: int = Field(default=10, ge=1, le=50)
 
+    # Observability Configuration
+    # otel_max_queue_size must exceed the peak concurrent span burst
+    # (roughly max_concurrent_sessions * spans_per_turn) or spans are dropped.
+    otel_max_queue_size: int = Field(default=4096, ge=1)
+    otel_schedule_delay_ms: int = Field(default=1000, ge=1)
+    otel_max_export_batch_size: int = Field(default=256, ge=1)
+    otel_export_timeout_ms: int = Field(default=10000, ge=1)
+
     model_config = {
         "env_file": ".env",
         "case_sensitive": False,
@@ -45,5 +56,11 @@ class Settings(BaseSettings):
     }
 
 
-# Global settings instance
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build settings once per process so .env is parsed and validated only once."""
+    return Settings()
+
+
+# Global settings instance (kept for backward compatibility)
+settings = get_settings()
@@ -5,9 +5,10 @@ Provides distributed tracing for LLM interactions and application performance.
 
 import logging
 from contextlib import contextmanager
+from functools import cached_property, lru_cache
 from typing import Optional
 
-from config import settings
+from config import get_settings
 from opentelemetry import trace
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
@@ -16,22 +17,40 @@ from opentelemetry.instrumentation.logging import LoggingInstrumentor
 from opentelemetry.sdk.resources import SERVICE_NAME, SERVICE_VERSION, Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.sdk.trace.sampling import TraceIdRatioBased
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
 
 logger = logging.getLogger(__name__)
 
+# Span attribute keys, bound once at import
+_KEY_AI_PROVIDER = "ai.provider"
+_KEY_AI_MODEL = "ai.model"
+_KEY_AI_OPERATION = "ai.operation"
+_KEY_CONVERSATION_SESSION_ID = "conversation.session_id"
+_KEY_CONVERSATION_CURRENT_STATE = "conversation.current_state"
+_KEY_CONVERSATION_PREVIOUS_STATE = "conversation.previous_state"
+_KEY_CONVERSATION_TURN_COUNT = "conversation.turn_count"
+_KEY_CONVERSATION_USER_INTENT = "conversation.user_intent"
+_KEY_VOICE_OPERATION = "voice.operation"
+_KEY_VOICE_PROVIDER = "voice.provider"
+_KEY_VOICE_SESSION_ID = "voice.session_id"
+_KEY_VOICE_AUDIO_DURATION_MS = "voice.audio_duration_ms"
+_KEY_GRAPH_SESSION_ID = "graph.session_id"
+_KEY_GRAPH_NODE_NAME = "graph.node_name"
+
 
 class ObservabilityConfig:
     """Observability configuration derived from settings."""
 
     def __init__(self):
+        settings = get_settings()
         self.enabled = getattr(settings, "enable_tracing", True)
         self.service_name = "argument-clinic-backend"
         self.service_version = "2.0.0"
         self.jaeger_endpoint = getattr(settings, "jaeger_endpoint", "http://localhost:14250")
-        self.sample_rate = getattr(settings, "trace_sample_rate", 1.0)
+        default_rate = 1.0 if settings.environment == "development" else 0.05
+        self.sample_rate = float(getattr(settings, "trace_sample_rate", default_rate))
 
-    @property
+    @cached_property
     def otlp_endpoint(self) -> str:
         """Convert Jaeger endpoint to OTLP format."""
         if "localhost:16686" in self.jaeger_endpoint:
@@ -39,35 +58,48 @@ class ObservabilityConfig:
         return self.jaeger_endpoint
 
 
-observability_config = ObservabilityConfig()
+@lru_cache(maxsize=1)
+def get_observability_config() -> ObservabilityConfig:
+    """Build the observability config on first use rather than at import."""
+    return ObservabilityConfig()
+
+
 _tracer_provider: Optional[TracerProvider] = None
 _span_processor: Optional[BatchSpanProcessor] = None
 
 
+@lru_cache(maxsize=1)
+def _resource() -> Resource:
+    """Service metadata resource, built once per process."""
+    settings = get_settings()
+    observability_config = get_observability_config()
+    return Resource.create(
+        {
+            SERVICE_NAME: observability_config.service_name,
+            SERVICE_VERSION: observability_config.service_version,
+            "environment": settings.environment,
+            "debug": settings.debug,
+        }
+    )
+
+
 def setup_observability(app) -> None:
     """Set up OpenTelemetry tracing with OTLP exporter."""
     global _tracer_provider, _span_processor
 
+    settings = get_settings()
+    observability_config = get_observability_config()
+
     if not observability_config.enabled:
         logger.info("OpenTelemetry tracing disabled")
         return
 
     try:
-        # Create resource with service metadata
-        resource = Resource.create(
-            {
-                SERVICE_NAME: observability_config.service_name,
-                SERVICE_VERSION: observability_config.service_version,
-                "environment": settings.environment,
-                "debug": settings.debug,
-            }
-        )
-
-        # Configure sampling
-        sampler = TraceIdRatioBased(observability_config.sample_rate)
+        # Configure sampling: child spans follow the root websocket span's decision
+        sampler = ParentBased(root=TraceIdRatioBased(observability_config.sample_rate))
 
         # Set up tracer provider
-        _tracer_provider = TracerProvider(resource=resource, sampler=sampler)
+        _tracer_provider = TracerProvider(resource=_resource(), sampler=sampler)
         trace.set_tracer_provider(_tracer_provider)
 
         # Configure OTLP exporter (modern replacement for Jaeger exporter)
@@ -75,16 +107,19 @@ def setup_observability(app) -> None:
             endpoint=observability_config.otlp_endpoint, insecure=True  # For local development
         )
 
-        # Add span processor
-        _span_processor = BatchSpanProcessor(otlp_exporter)
+        # Add span processor, tuned to flush often and absorb bursty LLM traffic
+        _span_processor = BatchSpanProcessor(
+            otlp_exporter,
+            max_queue_size=settings.otel_max_queue_size,
+            schedule_delay_millis=settings.otel_schedule_delay_ms,
+            max_export_batch_size=settings.otel_max_export_batch_size,
+            export_timeout_millis=settings.otel_export_timeout_ms,
+        )
         _tracer_provider.add_span_processor(_span_processor)
 
         # Instrument FastAPI
         FastAPIInstrumentor.instrument_app(app)
 
-        # Instrument HTTP client for LLM API calls
-        HTTPXClientInstrumentor().instrument()
-
         # Instrument logging
         LoggingInstrumentor().instrument(set_logging_format=True)
 
@@ -97,15 +132,29 @@ def setup_observability(app) -> None:
         logger.info("Application will continue without tracing")
 
 
+def flush_observability(timeout_millis: int = 5000) -> None:
+    """Export any spans still queued in the batch processor."""
+    if _tracer_provider:
+        _tracer_provider.force_flush(timeout_millis=timeout_millis)
+
+
 def shutdown_observability() -> None:
-    """Clean shutdown of observability components."""
+    """Clean shutdown of observability components. Safe to call more than once."""
     global _span_processor
 
     if _span_processor:
+        flush_observability()
         _span_processor.shutdown()
+        _span_processor = None
         logger.info("OpenTelemetry span processor shut down")
 
 
+def instrument_llm_http_client(client) -> None:
+    """Trace HTTP calls made through one LLM client instead of every httpx client."""
+    if get_observability_config().enabled:
+        HTTPXClientInstrumentor.instrument_client(client)
+
+
 def get_tracer(name: str = __name__) -> trace.Tracer:
     """Get a tracer instance for manual instrumentation."""
     return trace.get_tracer(name)
@@ -117,7 +166,10 @@ class LLMTracer:
     def __init__(self):
         self.tracer = get_tracer("ai-interactions")
 
-    @contextmanager
+    @cached_property
+    def _enabled(self) -> bool:
+        return get_observability_config().enabled
+
     def trace_llm_call(
         self, provider: str, model: str, operation: str = "completion", **attributes
     ):
@@ -130,15 +182,22 @@ class LLMTracer:
             operation: Type of operation (completion, transcription, synthesis)
             **attributes: Additional span attributes
         """
+        return self._start_llm_span(provider, model, operation, attributes)
+
+    @contextmanager
+    def _start_llm_span(self, provider: str, model: str, operation: str, attrs: dict):
+        """Start an llm_* span; attrs is set as-is, without merging into another dict."""
+        if not self._enabled:
+            yield None
+            return
+
         with self.tracer.start_as_current_span(f"llm_{operation}") as span:
-            span.set_attributes(
-                {
-                    "ai.provider": provider,
-                    "ai.model": model,
-                    "ai.operation": operation,
-                    **attributes,
-                }
-            )
+            if span.is_recording():
+                span.set_attribute(_KEY_AI_PROVIDER, provider)
+                span.set_attribute(_KEY_AI_MODEL, model)
+                span.set_attribute(_KEY_AI_OPERATION, operation)
+                if attrs:
+                    span.set_attributes(attrs)
 
             try:
                 yield span
@@ -167,20 +226,23 @@ class LLMTracer:
             user_intent: Detected user intention
             **metadata: Additional conversation metadata
         """
+        if not self._enabled:
+            return
+
         with self.tracer.start_as_current_span("conversation_flow") as span:
-            span.set_attributes(
-                {
-                    "conversation.session_id": session_id,
-                    "conversation.current_state": current_state,
-                    "conversation.turn_count": turn_count,
-                    **metadata,
-                }
-            )
+            if not span.is_recording():
+                return
+
+            span.set_attribute(_KEY_CONVERSATION_SESSION_ID, session_id)
+            span.set_attribute(_KEY_CONVERSATION_CURRENT_STATE, current_state)
+            span.set_attribute(_KEY_CONVERSATION_TURN_COUNT, turn_count)
+            if metadata:
+                span.set_attributes(metadata)
 
             if previous_state:
-                span.set_attribute("conversation.previous_state", previous_state)
+                span.set_attribute(_KEY_CONVERSATION_PREVIOUS_STATE, previous_state)
             if user_intent:
-                span.set_attribute("conversation.user_intent", user_intent)
+                span.set_attribute(_KEY_CONVERSATION_USER_INTENT, user_intent)
 
     def trace_voice_processing(
         self,
@@ -200,18 +262,21 @@ class LLMTracer:
             audio_duration_ms: Audio duration in milliseconds
             **attributes: Additional voice processing attributes
         """
+        if not self._enabled:
+            return
+
         with self.tracer.start_as_current_span(f"voice_{operation}") as span:
-            span.set_attributes(
-                {
-                    "voice.operation": operation,
-                    "voice.provider": provider,
-                    "voice.session_id": session_id,
-                    **attributes,
-                }
-            )
+            if not span.is_recording():
+                return
+
+            span.set_attribute(_KEY_VOICE_OPERATION, operation)
+            span.set_attribute(_KEY_VOICE_PROVIDER, provider)
+            span.set_attribute(_KEY_VOICE_SESSION_ID, session_id)
+            if attributes:
+                span.set_attributes(attributes)
 
             if audio_duration_ms:
-                span.set_attribute("voice.audio_duration_ms", audio_duration_ms)
+                span.set_attribute(_KEY_VOICE_AUDIO_DURATION_MS, audio_duration_ms)
 
     @contextmanager
     def trace_graph_execution(self, session_id: str, node_name: str, **attributes):
@@ -223,10 +288,16 @@ class LLMTracer:
             node_name: Name of the graph node being executed
             **attributes: Additional node execution attributes
         """
+        if not self._enabled:
+            yield None
+            return
+
         with self.tracer.start_as_current_span(f"graph_node_{node_name}") as span:
-            span.set_attributes(
-                {"graph.session_id": session_id, "graph.node_name": node_name, **attributes}
-            )
+            if span.is_recording():
+                span.set_attribute(_KEY_GRAPH_SESSION_ID, session_id)
+                span.set_attribute(_KEY_GRAPH_NODE_NAME, node_name)
+                if attributes:
+                    span.set_attributes(attributes)
 
             try:
                 yield span
@@ -243,33 +314,19 @@ llm_tracer = LLMTracer()
 # Convenience functions for common tracing patterns
 def trace_ai_agent_call(provider: str, model: str, prompt_length: int, **kwargs):
     """Convenience function for tracing AI agent calls."""
-    return llm_tracer.trace_llm_call(
-        provider=provider,
-        model=model,
-        operation="agent_call",
-        prompt_length=prompt_length,
-        **kwargs,
-    )
+    kwargs["prompt_length"] = prompt_length
+    return llm_tracer._start_llm_span(provider, model, "agent_call", kwargs)
 
 
 def trace_voice_transcription(provider: str, audio_size_bytes: int, **kwargs):
     """Convenience function for tracing voice transcription."""
-    return llm_tracer.trace_llm_call(
-        provider=provider,
-        model="whisper" if provider == "openai" else "unknown",
-        operation="transcription",
-        audio_size_bytes=audio_size_bytes,
-        **kwargs,
-    )
+    kwargs["audio_size_bytes"] = audio_size_bytes
+    model = "whisper" if provider == "openai" else "unknown"
+    return llm_tracer._start_llm_span(provider, model, "transcription", kwargs)
 
 
 def trace_voice_synthesis(provider: str, text_length: int, voice_id: str, **kwargs):
     """Convenience function for tracing voice synthesis."""
-    return llm_tracer.trace_llm_call(
-        provider=provider,
-        model="tts",
-        operation="synthesis",
-        text_length=text_length,
-        voice_id=voice_id,
-        **kwargs,
-    )
+    kwargs["text_length"] = text_length
+    kwargs["voice_id"] = voice_id
+    return llm_tracer._start_llm_span(provider, "tts", "synthesis", kwargs)
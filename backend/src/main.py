@@ -3,17 +3,24 @@ The Argument Clinic FastAPI application.
 A real-time AI recreation of Monty Python's Argument Clinic.
 """
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
+from pathlib import Path
 
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
-from config import settings
-from core.observability import setup_observability
+from config import get_settings
+from core.observability import setup_observability, shutdown_observability
 from routes.websocket import router as websocket_router
+from services.argument_clinic_graph import instrument_agent_http_client
+from services.voice_service import close_http_client, instrument_http_client
+
+settings = get_settings()
 
 # Configure logging
 logging.basicConfig(
@@ -22,6 +29,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# backend/static, resolved from this file rather than the working directory
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -29,13 +39,19 @@ async def lifespan(app: FastAPI):
     logger.info("Starting The Argument Clinic FastAPI server...")
     logger.info(f"Environment: {settings.environment}")
     logger.info(f"Debug mode: {settings.debug}")
+
+    # Trace LLM and voice provider calls, now that observability is configured
+    instrument_agent_http_client()
+    instrument_http_client()
     yield
     logger.info("Shutting down The Argument Clinic FastAPI server...")
 
-    # Clean shutdown of observability
-    from core.observability import shutdown_observability
+    # Release pooled voice provider connections
+    await close_http_client()
 
-    shutdown_observability()
+    # Flush queued spans and shut down observability. Uvicorn runs this on
+    # SIGTERM too; the flush can block for seconds, so keep it off the loop.
+    await asyncio.to_thread(shutdown_observability)
 
 
 def create_app() -> FastAPI:
@@ -46,6 +62,7 @@ def create_app() -> FastAPI:
         version="2.0.0",
         lifespan=lifespan,
         debug=settings.debug,
+        default_response_class=ORJSONResponse,
     )
 
     # Configure CORS
@@ -64,10 +81,10 @@ def create_app() -> FastAPI:
     app.include_router(websocket_router)
 
     # Serve static files if directory exists
-    try:
-        app.mount("/static", StaticFiles(directory="static"), name="static")
+    if STATIC_DIR.is_dir():
+        app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
         logger.info("Mounted static files directory")
-    except RuntimeError:
+    else:
         logger.info("No static directory found, skipping static files")
 
     return app
@@ -103,10 +120,15 @@ async def health_check():
 
 
 if __name__ == "__main__":
+    is_development = settings.environment == "development"
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=settings.host,
+        port=settings.port,
         log_level=settings.log_level.lower(),
-        reload=settings.debug,
+        loop="uvloop",
+        http="httptools",
+        reload=settings.debug and is_development,
+        workers=1 if settings.debug else settings.uvicorn_workers,
+        access_log=is_development,
     )
@@ -6,7 +6,10 @@ from datetime import datetime
 from enum import Enum
 from typing import Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+# Shared config for immutable DTOs built once per message / turn
+FROZEN_MODEL_CONFIG = ConfigDict(frozen=True, extra="ignore")
 
 
 class ArgumentState(str, Enum):
@@ -34,23 +37,31 @@ class MessageType(str, Enum):
     USER_INPUT = "user_input"
     VOICE_INPUT = "voice_input"
     AI_RESPONSE = "ai_response"
+    AUDIO_CHUNK = "audio_chunk"
     TRANSCRIPTION = "transcription"
     ERROR = "error"
     SESSION_START = "session_start"
 
 
+# Cached value -> member map so hot paths skip Enum's lookup machinery
+MESSAGE_TYPE_LOOKUP: dict[str, MessageType] = {m.value: m for m in MessageType}
+
+
 class WebSocketMessage(BaseModel):
     """WebSocket message format."""
 
+    model_config = FROZEN_MODEL_CONFIG
+
     type: MessageType
     content: str
     session_id: str
-    audio_data: str | None = None
 
 
 class SessionInfo(BaseModel):
     """Session metadata and status."""
 
+    model_config = FROZEN_MODEL_CONFIG
+
     session_id: str
     current_state: ArgumentState
     turn_count: int
@@ -62,6 +73,8 @@ class SessionInfo(BaseModel):
 class ConversationTurn(BaseModel):
     """Single turn in a conversation."""
 
+    model_config = FROZEN_MODEL_CONFIG
+
     user_input: str
     ai_response: str
     state: ArgumentState
@@ -95,6 +108,8 @@ class MetricsResponse(BaseModel):
 class TextProcessRequest(BaseModel):
     """Request for text processing."""
 
+    model_config = FROZEN_MODEL_CONFIG
+
     session_id: str
     text: str
 
@@ -102,6 +117,8 @@ class TextProcessRequest(BaseModel):
 class TextProcessResponse(BaseModel):
     """Response from text processing."""
 
+    model_config = FROZEN_MODEL_CONFIG
+
     session_id: str
     user_text: str
     ai_response: str
@@ -3,28 +3,81 @@ Performance monitoring and metrics collection.
 """
 
 import time
-from collections import deque
 from dataclasses import dataclass, field
 from typing import Any
 
+import numpy as np
+
+NS_PER_MS = 1_000_000
+
+
+class RollingWindow:
+    """Fixed-size sample window backed by a preallocated numpy ring buffer.
+
+    Samples are integer nanoseconds stored in an int64 array, so aggregation
+    runs in native code; the running sum keeps the mean O(1).
+    """
+
+    def __init__(self, maxlen: int):
+        self.maxlen = maxlen
+        self._buffer = np.zeros(maxlen, dtype=np.int64)
+        self._index = 0
+        self._count = 0
+        self._sum = 0
+
+    def append(self, value: int) -> None:
+        """Add a sample, overwriting the oldest once the window is full."""
+        if self._count == self.maxlen:
+            self._sum -= int(self._buffer[self._index])
+        else:
+            self._count += 1
+
+        self._buffer[self._index] = value
+        self._sum += value
+        self._index = (self._index + 1) % self.maxlen
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _samples(self) -> np.ndarray:
+        # Slot order is irrelevant for the aggregates below
+        return self._buffer[: self._count]
+
+    def mean(self) -> float:
+        return self._sum / self._count if self._count else 0
+
+    def min(self) -> int:
+        return int(self._samples().min()) if self._count else 0
+
+    def max(self) -> int:
+        return int(self._samples().max()) if self._count else 0
+
+    def percentiles(self, *fractions: float) -> list[int]:
+        """Nearest-rank percentiles, e.g. percentiles(0.95, 0.99) for p95/p99."""
+        if not self._count:
+            return [0] * len(fractions)
+        ranks = [int(self._count * fraction) for fraction in fractions]
+        partitioned = np.partition(self._samples(), ranks)
+        return [int(partitioned[rank]) for rank in ranks]
+
 
 @dataclass
 class PerformanceMetrics:
     """Collect and calculate performance metrics."""
 
-    response_times: deque = field(default_factory=lambda: deque(maxlen=100))
+    response_times: RollingWindow = field(default_factory=lambda: RollingWindow(maxlen=100))
     error_count: int = 0
     success_count: int = 0
     session_count: int = 0
-    audio_processing_times: deque = field(default_factory=lambda: deque(maxlen=50))
+    audio_processing_times: RollingWindow = field(default_factory=lambda: RollingWindow(maxlen=50))
 
-    def add_response_time(self, ms: float):
-        """Add a response time measurement."""
-        self.response_times.append(ms)
+    def add_response_time(self, ns: int):
+        """Add a response time measurement in nanoseconds."""
+        self.response_times.append(ns)
 
-    def add_audio_processing_time(self, ms: float):
-        """Add an audio processing time measurement."""
-        self.audio_processing_times.append(ms)
+    def add_audio_processing_time(self, ns: int):
+        """Add an audio processing time measurement in nanoseconds."""
+        self.audio_processing_times.append(ns)
 
     def increment_success(self):
         """Increment successful operations counter."""
@@ -40,22 +93,23 @@ class PerformanceMetrics:
 
     def get_metrics(self) -> dict[str, Any]:
         """Get current metrics summary."""
-        response_times = list(self.response_times)
-        audio_times = list(self.audio_processing_times)
+        response_times = self.response_times
+        audio_times = self.audio_processing_times
 
+        p95_ns, p99_ns = response_times.percentiles(0.95, 0.99)
         total_requests = self.success_count + self.error_count
 
         return {
             "response_times": {
-                "avg_ms": sum(response_times) / len(response_times) if response_times else 0,
-                "min_ms": min(response_times) if response_times else 0,
-                "max_ms": max(response_times) if response_times else 0,
-                "p95_ms": sorted(response_times)[int(len(response_times) * 0.95)] if response_times else 0,
-                "p99_ms": sorted(response_times)[int(len(response_times) * 0.99)] if response_times else 0,
+                "avg_ms": response_times.mean() / NS_PER_MS,
+                "min_ms": response_times.min() / NS_PER_MS,
+                "max_ms": response_times.max() / NS_PER_MS,
+                "p95_ms": p95_ns / NS_PER_MS,
+                "p99_ms": p99_ns / NS_PER_MS,
                 "count": len(response_times)
             },
             "audio_processing": {
-                "avg_ms": sum(audio_times) / len(audio_times) if audio_times else 0,
+                "avg_ms": audio_times.mean() / NS_PER_MS,
                 "count": len(audio_times)
             },
             "requests": {
@@ -74,15 +128,15 @@ class PerformanceMetrics:
 metrics = PerformanceMetrics()
 
 
-def track_response_time(start_time: float) -> float:
-    """Helper to track response time from start time."""
-    response_time_ms = (time.time() - start_time) * 1000
-    metrics.add_response_time(response_time_ms)
-    return response_time_ms
+def track_response_time(start_ns: int) -> float:
+    """Helper to track response time from a time.perf_counter_ns() start; returns ms."""
+    elapsed_ns = time.perf_counter_ns() - start_ns
+    metrics.add_response_time(elapsed_ns)
+    return elapsed_ns / NS_PER_MS
 
 
-def track_audio_processing(start_time: float) -> float:
-    """Helper to track audio processing time from start time."""
-    processing_time_ms = (time.time() - start_time) * 1000
-    metrics.add_audio_processing_time(processing_time_ms)
-    return processing_time_ms
+def track_audio_processing(start_ns: int) -> float:
+    """Helper to track audio processing time from a time.perf_counter_ns() start; returns ms."""
+    elapsed_ns = time.perf_counter_ns() - start_ns
+    metrics.add_audio_processing_time(elapsed_ns)
+    return elapsed_ns / NS_PER_MS
@@ -3,41 +3,67 @@ WebSocket endpoints for real-time argument clinic conversations.
 """
 
 import asyncio
-import base64
-import json
+import heapq
 import logging
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Dict, Optional
 from uuid import uuid4
 
+import orjson
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic_graph import End
 
 from config import settings
-from models.argument import ArgumentState, MessageType
+from models.argument import MESSAGE_TYPE_LOOKUP, ArgumentState, MessageType
 from performance import metrics, track_response_time
 from services.argument_clinic_graph import (
     ArgumentClinicContext,
     EntryNode,
+    WaitForInput,
+    answer_unpaid_input,
     argument_clinic_graph,
 )
-from services.voice_service import voice_service
+from services.voice_service import get_voice_service
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
+# Message type values, resolved once instead of through the Enum on every message
+_MT_VOICE_INPUT = MessageType.VOICE_INPUT.value
+_MT_AI_RESPONSE = MessageType.AI_RESPONSE.value
+_MT_AUDIO_CHUNK = MessageType.AUDIO_CHUNK.value
+
+# Pre-encoded frame skeletons for fixed-shape messages; only the variable
+# fields are encoded per send. Session ids are UUID strings and need no escaping.
+_SESSION_START_PREFIX = (
+    orjson.dumps(
+        {
+            "type": MessageType.SESSION_START.value,
+            "content": "Welcome to the Argument Clinic! Please start by saying something.",
+        }
+    ).decode()[:-1]
+    + ',"session_id":"'
+)
+_ERROR_PREFIX = '{"type":"' + MessageType.ERROR.value + '","session_id":"'
+
 
 class TranscriptionValidator:
     """Validates transcription quality."""
 
-    INVALID_PATTERNS = [
-        ".",
-        "...",
-        "Thank you.",
-        "Thank you for watching",
-        "Thanks for watching",
-    ]  # Removed empty string
+    __slots__ = ()
+
+    INVALID_PATTERNS = frozenset(
+        {
+            ".",
+            "...",
+            "Thank you.",
+            "Thank you for watching",
+            "Thanks for watching",
+        }
+    )  # Exact matches only
 
     @classmethod
     def is_valid(cls, text: str) -> bool:
@@ -46,14 +72,25 @@ class TranscriptionValidator:
             return False
 
         cleaned = text.strip()
-        return len(cleaned) >= 2 and cleaned not in cls.INVALID_PATTERNS  # Exact matches only
+        return len(cleaned) >= 2 and cleaned not in cls.INVALID_PATTERNS
 
 
 class GraphSession:
     """Manages a stateful graph session for WebSocket conversation."""
 
-    def __init__(self, session_id: str):
-        self.session_id = session_id
+    __slots__ = (
+        "session_id",
+        "session_key",
+        "state",
+        "graph_runner",
+        "graph_context",
+        "is_processing",
+        "created_at",
+    )
+
+    def __init__(self, session_id: str, session_key: int):
+        self.session_id = session_id  # String form for clients and logs
+        self.session_key = session_key  # 128-bit int form for session table lookups
         self.state = ArgumentClinicContext(session_id=session_id)
         self.graph_runner = None
         self.graph_context = None
@@ -67,17 +104,29 @@ class GraphSession:
             self.graph_context = await self.graph_runner.__aenter__()
             await self.graph_context.next()  # Execute EntryNode
 
+    async def _advance_until_wait(self) -> str:
+        """Run graph nodes until the graph is waiting for input again.
+
+        Returns the name of the last node run, i.e. the one that produced the response.
+        """
+        node = self.graph_context.next_node
+        while True:
+            last_node_name = type(node).__name__
+            node = await self.graph_context.next()
+            if isinstance(node, (WaitForInput, End)):
+                return last_node_name
+
     async def process_input(self, user_input: str) -> tuple[str, float, str]:
         """Process user input through the graph and return response."""
         if self.is_processing:
-            logger.warning(f"Session {self.session_id} rejected concurrent processing")
+            logger.warning("Session %s rejected concurrent processing", self.session_id)
             return (
                 "Please wait for the current response to complete.",
                 0.0,
                 "ConcurrencyError",
             )
 
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
 
         try:
             self.is_processing = True
@@ -85,21 +134,18 @@ class GraphSession:
             if self.graph_runner is None:
                 await self.start_graph()
 
-            # Process through graph: WaitForInput -> ProcessUserInput -> ResponseNode -> WaitForInput
-            self.state.current_input = user_input
-
-            # Execute the three graph steps
-            await self.graph_context.next()  # ProcessUserInput
-            self.state = self.graph_context.state
+            # Stuck at the pay wall: answer locally and leave the graph waiting
+            if (response := answer_unpaid_input(self.state, user_input)) is not None:
+                processing_time = track_response_time(start_ns)
+                metrics.increment_success()
+                return response, processing_time, "ResolutionNode"
 
-            current_node = await self.graph_context.next()  # ResponseNode
-            self.state = self.graph_context.state
-            response_node_name = type(current_node).__name__
-
-            await self.graph_context.next()  # Back to WaitForInput
+            # Process through graph: WaitForInput -> ProcessUserInput -> ResponseNode(s) -> WaitForInput
+            self.state.current_input = user_input
+            response_node_name = await self._advance_until_wait()
             self.state = self.graph_context.state
 
-            processing_time = track_response_time(start_time)
+            processing_time = track_response_time(start_ns)
             metrics.increment_success()
 
             response = self.state.last_response or "Good morning! Welcome to the Argument Clinic."
@@ -107,7 +153,7 @@ class GraphSession:
             return response, processing_time, response_node_name
 
         except Exception as e:
-            logger.error(f"Graph processing error for session {self.session_id}: {e}")
+            logger.error("Graph processing error for session %s: %s", self.session_id, e)
             metrics.increment_error()
             raise
         finally:
@@ -115,51 +161,110 @@ class GraphSession:
 
 
 class SessionManager:
-    """Manages WebSocket sessions and their lifecycle."""
-
-    def __init__(self):
-        self.active_sessions: Dict[str, GraphSession] = {}
-        self.session_timeouts: Dict[str, asyncio.Task] = {}
+    """Manages WebSocket sessions and their lifecycle.
 
-    def create_session(self) -> GraphSession:
-        """Create a new session with timeout management."""
-        session_id = str(uuid4())
-        session = GraphSession(session_id)
+    Sessions are keyed by the UUID's integer value, which hashes more cheaply
+    than its 36-char string form on every message. The table is kept in
+    least-recently-active order so the stalest session is evicted at capacity;
+    its connection is closed so the evicted client stops running turns.
+    """
 
-        self.active_sessions[session_id] = session
-        self.session_timeouts[session_id] = asyncio.create_task(
-            self._cleanup_after_timeout(session_id)
-        )
+    def __init__(self):
+        self.active_sessions: OrderedDict[int, GraphSession] = OrderedDict()
+        self.last_activity: Dict[int, float] = {}
+        self._websockets: Dict[int, WebSocket] = {}
+        # Min-heap of (deadline, session_key), swept by a single task for all sessions
+        self._deadlines: list[tuple[float, int]] = []
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def create_session(self, websocket: WebSocket) -> GraphSession:
+        """Create a new session for websocket with timeout management."""
+        session_uuid = uuid4()
+        session_key = session_uuid.int
+        session = GraphSession(str(session_uuid), session_key)
+
+        while len(self.active_sessions) >= settings.max_concurrent_sessions:
+            await self._evict_least_recent()
+
+        now = time.monotonic()
+        self.active_sessions[session_key] = session
+        self._websockets[session_key] = websocket
+        self.last_activity[session_key] = now
+        heapq.heappush(self._deadlines, (now + settings.max_session_minutes * 60, session_key))
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_timeouts())
 
         metrics.increment_session()
-        logger.info(f"Created session {session_id}")
+        logger.info("Created session %s", session.session_id)
         return session
 
-    def reset_timeout(self, session_id: str) -> None:
-        """Reset session timeout on activity."""
-        if session_id in self.session_timeouts:
-            self.session_timeouts[session_id].cancel()
-            self.session_timeouts[session_id] = asyncio.create_task(
-                self._cleanup_after_timeout(session_id)
-            )
+    def reset_timeout(self, session_key: int) -> None:
+        """Reset session timeout on activity; the sweeper reschedules it when the old deadline passes."""
+        if session_key in self.last_activity:
+            self.last_activity[session_key] = time.monotonic()
+            self.active_sessions.move_to_end(session_key)
+
+    def cleanup_session(self, session_key: int) -> None:
+        """Immediately clean up a session; its heap entry is dropped by the sweeper."""
+        session = self.active_sessions.pop(session_key, None)
+        self.last_activity.pop(session_key, None)
+        self._websockets.pop(session_key, None)
+        if session:
+            logger.info("Cleaned up session %s", session.session_id)
+
+    async def _evict_least_recent(self) -> None:
+        """Drop the session that has been idle the longest and close its connection."""
+        session_key, session = self.active_sessions.popitem(last=False)
+        self.last_activity.pop(session_key, None)
+        websocket = self._websockets.pop(session_key, None)
+        logger.warning(
+            "Evicted session %s: %s concurrent sessions reached",
+            session.session_id,
+            settings.max_concurrent_sessions,
+        )
+        if websocket is not None:
+            try:
+                # 1013 "try again later"; the handler's receive loop then ends
+                await websocket.close(code=1013)
+            except Exception as e:
+                logger.warning("Failed to close evicted session %s: %s", session.session_id, e)
+
+    async def _sweep_timeouts(self) -> None:
+        """Clean up sessions once they have been idle for the full timeout.
+
+        Runs while any deadline is pending. Entries of sessions that saw activity
+        are pushed back with their new deadline instead of on every message.
+        """
+        timeout = settings.max_session_minutes * 60
+        while self._deadlines:
+            deadline, session_key = self._deadlines[0]
+            now = time.monotonic()
+            if deadline > now:
+                await asyncio.sleep(deadline - now)
+                continue
 
-    def cleanup_session(self, session_id: str) -> None:
-        """Immediately clean up a session."""
-        if session_id in self.active_sessions:
-            del self.active_sessions[session_id]
-        if session_id in self.session_timeouts:
-            self.session_timeouts[session_id].cancel()
-            del self.session_timeouts[session_id]
-        logger.info(f"Cleaned up session {session_id}")
-
-    async def _cleanup_after_timeout(self, session_id: str) -> None:
-        """Clean up session after timeout."""
-        await asyncio.sleep(settings.max_session_minutes * 60)
-        if session_id in self.active_sessions:
-            del self.active_sessions[session_id]
-            logger.info(f"Timed out session {session_id}")
-        if session_id in self.session_timeouts:
-            del self.session_timeouts[session_id]
+            heapq.heappop(self._deadlines)
+            last_activity = self.last_activity.get(session_key)
+            if last_activity is None:
+                continue  # Already cleaned up
+            if last_activity + timeout > now:
+                heapq.heappush(self._deadlines, (last_activity + timeout, session_key))
+                continue
+
+            session = self.active_sessions.pop(session_key, None)
+            self.last_activity.pop(session_key, None)
+            websocket = self._websockets.pop(session_key, None)
+            if session is None:
+                continue
+            logger.info("Timed out session %s", session.session_id)
+            if websocket is not None:
+                try:
+                    # 1001 "going away"; the handler's receive loop then ends
+                    await websocket.close(code=1001)
+                except Exception as e:
+                    logger.warning(
+                        "Failed to close timed out session %s: %s", session.session_id, e
+                    )
 
     def get_active_count(self) -> int:
         """Get number of active sessions."""
@@ -173,12 +278,16 @@ class WebSocketHandler:
         self.websocket = websocket
         self.session_manager = session_manager
         self.session: Optional[GraphSession] = None
+        self._binary_audio_format = "webm"
+        self._response_count = 0
+        self._tts_tasks: set[asyncio.Task] = set()
+        self._audio_send_lock = asyncio.Lock()
 
     async def handle_connection(self) -> None:
         """Handle the entire WebSocket connection lifecycle."""
         await self.websocket.accept()
 
-        self.session = self.session_manager.create_session()
+        self.session = await self.session_manager.create_session(self.websocket)
 
         try:
             await self._send_session_start()
@@ -187,46 +296,60 @@ class WebSocketHandler:
                 await self._process_message(message)
 
         except WebSocketDisconnect:
-            logger.info(f"WebSocket disconnected for session {self.session.session_id}")
+            logger.info("WebSocket disconnected for session %s", self.session.session_id)
         except Exception as e:
-            logger.error(f"WebSocket error for session {self.session.session_id}: {e}")
+            logger.error("WebSocket error for session %s: %s", self.session.session_id, e)
             await self._send_error(f"Server error: {str(e)}")
         finally:
+            for task in self._tts_tasks:
+                task.cancel()
             if self.session:
-                self.session_manager.cleanup_session(self.session.session_id)
+                self.session_manager.cleanup_session(self.session.session_key)
 
     async def _receive_messages(self):
         """Async generator for receiving and parsing messages."""
         while True:
             try:
-                raw_message = await self.websocket.receive_text()
-                data = json.loads(raw_message)
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+
+                # Binary frames carry raw voice audio, no JSON or base64 involved
+                audio_bytes = message.get("bytes")
+                if audio_bytes is not None:
+                    data = {
+                        "type": _MT_VOICE_INPUT,
+                        "audio_bytes": audio_bytes,
+                    }
+                else:
+                    data = orjson.loads(message["text"])
 
                 # Reset session timeout on activity
-                self.session_manager.reset_timeout(self.session.session_id)
+                self.session_manager.reset_timeout(self.session.session_key)
 
                 yield data
 
-            except json.JSONDecodeError as e:
-                logger.error(f"Invalid JSON received: {e}")
+            except orjson.JSONDecodeError as e:
+                logger.error("Invalid JSON received: %s", e)
                 await self._send_error("Invalid message format")
                 continue
 
     async def _process_message(self, data: dict) -> None:
         """Process a single WebSocket message."""
-        message_type = data.get("type")
+        raw_type = data.get("type")
+        message_type = MESSAGE_TYPE_LOOKUP.get(raw_type) if isinstance(raw_type, str) else None
 
-        if message_type == MessageType.USER_INPUT.value:
+        if message_type is MessageType.USER_INPUT:
             await self._handle_text_input(data)
-        elif message_type == MessageType.VOICE_INPUT.value:
+        elif message_type is MessageType.VOICE_INPUT:
             await self._handle_voice_input(data)
         else:
-            await self._send_error(f"Unknown message type: {message_type}")
+            await self._send_error(f"Unknown message type: {raw_type}")
 
     async def _handle_text_input(self, data: dict) -> None:
         """Handle text input from user."""
         user_input = data.get("content", "")
-        logger.info(f"Processing text input: '{user_input}'")
+        logger.info("Processing text input: '%s'", user_input)
 
         try:
             response_text, response_time, current_node = await self.session.process_input(
@@ -234,28 +357,35 @@ class WebSocketHandler:
             )
             await self._send_ai_response(response_text, response_time, current_node)
         except Exception as e:
-            logger.error(f"Text processing error: {e}")
+            logger.error("Text processing error: %s", e)
             await self._send_error(f"Processing failed: {str(e)}")
 
     async def _handle_voice_input(self, data: dict) -> None:
-        """Handle voice input from user."""
-        audio_data_b64 = data.get("audio_data", "")
-        logger.info(f"Processing voice input")
+        """Handle voice input sent as a JSON header followed by a binary audio frame."""
+        audio_bytes = data.get("audio_bytes")
+        if not isinstance(audio_bytes, bytes):
+            # Header frame: remember the format for the binary frame that follows
+            self._binary_audio_format = data.get("format") or "webm"
+            return
+
+        await self._process_voice_audio(audio_bytes, self._binary_audio_format)
+
+    async def _process_voice_audio(self, audio_data: bytes, audio_format: str) -> None:
+        """Transcribe voice audio and run the transcription through the graph."""
+        logger.info("Processing voice input")
 
         try:
-            # Decode and transcribe audio
-            audio_data = base64.b64decode(audio_data_b64)
-            transcribed_text = voice_service.transcribe_audio(audio_data, "webm")
+            transcribed_text = await get_voice_service().transcribe_audio(
+                audio_data, audio_format
+            )
 
             # Validate transcription
             if not transcribed_text or not TranscriptionValidator.is_valid(transcribed_text):
-                logger.info(f"Rejecting invalid transcription: '{transcribed_text}'")
+                logger.info("Rejecting invalid transcription: '%s'", transcribed_text)
                 return
 
-            # Send transcription confirmation
-            await self._send_transcription(transcribed_text)
-
-            # Process transcribed text
+            # Process transcribed text; the transcription rides along in the
+            # ai_response envelope rather than its own frame
             response_text, response_time, current_node = await self.session.process_input(
                 transcribed_text
             )
@@ -268,28 +398,12 @@ class WebSocketHandler:
             )
 
         except Exception as e:
-            logger.error(f"Voice processing error: {e}")
+            logger.error("Voice processing error: %s", e)
             await self._send_error(f"Voice processing failed: {str(e)}")
 
     async def _send_session_start(self) -> None:
         """Send session start message."""
-        await self._send_raw_message(
-            {
-                "type": MessageType.SESSION_START.value,
-                "content": "Welcome to the Argument Clinic! Please start by saying something.",
-                "session_id": self.session.session_id,
-            }
-        )
-
-    async def _send_transcription(self, text: str) -> None:
-        """Send transcription confirmation."""
-        await self._send_raw_message(
-            {
-                "type": MessageType.TRANSCRIPTION.value,
-                "content": text,
-                "session_id": self.session.session_id,
-            }
-        )
+        await self._send_raw_text(f'{_SESSION_START_PREFIX}{self.session.session_id}"}}')
 
     async def _send_ai_response(
         self,
@@ -299,25 +413,20 @@ class WebSocketHandler:
         transcribed_text: Optional[str] = None,
         is_voice: bool = False,
     ) -> None:
-        """Send AI response with optional TTS audio."""
-        # Generate TTS audio if voice service is available
-        audio_url = None
-        if voice_service.is_available():
-            try:
-                audio_data = voice_service.synthesize_speech(content, "mr_barnard")
-                if audio_data:
-                    audio_b64 = base64.b64encode(audio_data).decode("utf-8")
-                    audio_url = f"data:audio/mpeg;base64,{audio_b64}"
-            except Exception as e:
-                logger.warning(f"TTS generation failed: {e}")
+        """Send AI response text now; TTS audio follows separately once synthesized."""
+        self._response_count += 1
+        response_id = self._response_count
 
-        # Build response data
+        # Build response data; state is read once rather than per field
+        session = self.session
+        state = session.state
         response_data = {
-            "type": MessageType.AI_RESPONSE.value,
+            "type": _MT_AI_RESPONSE,
+            "response_id": response_id,
             "content": content,
-            "session_id": self.session.session_id,
-            "turn_count": self.session.state.turn_count,
-            "payment_received": self.session.state.payment_received,
+            "session_id": session.session_id,
+            "turn_count": state.turn_count,
+            "payment_received": state.payment_received,
             "current_node": current_node,
             "websocket_status": "connected",
             "response_time_ms": round(response_time, 2),
@@ -327,27 +436,63 @@ class WebSocketHandler:
             response_data["transcribed_text"] = transcribed_text
         if is_voice:
             response_data["is_voice"] = True
-        if audio_url:
-            response_data["audio_url"] = audio_url
 
         await self._send_raw_message(response_data)
 
+        # Hide TTS latency behind the text response
+        if get_voice_service().can_synthesize():
+            task = asyncio.create_task(self._synthesize_and_send(content, response_id))
+            self._tts_tasks.add(task)
+            task.add_done_callback(self._tts_tasks.discard)
+
+    async def _synthesize_and_send(self, content: str, response_id: int) -> None:
+        """Synthesize TTS audio and send it as an audio_chunk header plus binary frame."""
+        try:
+            # The client plays each reply as one clip, so gather the stream first
+            audio_data = await get_voice_service().synthesize_speech_bytes(
+                content, "mr_barnard"
+            )
+        except Exception:
+            return  # Already logged by the voice service, with every provider attempt
+
+        if not audio_data:
+            return
+
+        # Keep each header and its binary frame adjacent on the wire
+        async with self._audio_send_lock:
+            await self._send_raw_message(
+                {
+                    "type": _MT_AUDIO_CHUNK,
+                    "response_id": response_id,
+                    "session_id": self.session.session_id,
+                }
+            )
+            await self._send_raw_bytes(audio_data)
+
     async def _send_error(self, error_message: str) -> None:
         """Send error message."""
-        await self._send_raw_message(
-            {
-                "type": MessageType.ERROR.value,
-                "content": error_message,
-                "session_id": self.session.session_id if self.session else "unknown",
-            }
-        )
+        session_id = self.session.session_id if self.session else "unknown"
+        content = orjson.dumps(error_message).decode()
+        await self._send_raw_text(f'{_ERROR_PREFIX}{session_id}","content":{content}}}')
 
     async def _send_raw_message(self, message_dict: dict) -> None:
         """Send raw message with error handling."""
+        await self._send_raw_text(orjson.dumps(message_dict).decode())
+
+    async def _send_raw_text(self, frame: str) -> None:
+        """Send a pre-encoded JSON text frame with error handling."""
+        try:
+            # Text frames keep the browser client's JSON.parse path unchanged
+            await self.websocket.send_text(frame)
+        except Exception as e:
+            logger.error("Failed to send WebSocket message: %s", e)
+
+    async def _send_raw_bytes(self, payload: bytes) -> None:
+        """Send a binary frame (raw audio) with error handling."""
         try:
-            await self.websocket.send_text(json.dumps(message_dict))
+            await self.websocket.send_bytes(payload)
         except Exception as e:
-            logger.error(f"Failed to send WebSocket message: {e}")
+            logger.error("Failed to send WebSocket binary frame: %s", e)
 
 
 # Global session manager
@@ -364,6 +509,7 @@ async def websocket_argument_endpoint(websocket: WebSocket):
 @router.get("/health")
 async def health_check():
     """Health check endpoint with metrics."""
+    voice_service = get_voice_service()
     return {
         "status": "healthy",
         "active_sessions": session_manager.get_active_count(),
@@ -377,6 +523,7 @@ async def health_check():
 @router.get("/metrics")
 async def get_metrics():
     """Get detailed performance metrics."""
+    voice_service = get_voice_service()
     return {
         "performance": metrics.get_metrics(),
         "sessions": {
@@ -394,7 +541,8 @@ async def get_metrics():
 @router.get("/voices")
 async def get_available_voices():
     """Get available voices for TTS."""
+    voice_service = get_voice_service()
     return {
         "available": voice_service.is_available(),
-        "voices": voice_service.get_available_voices(),
+        "voices": await voice_service.get_available_voices(),
     }
@@ -6,15 +6,29 @@ Resolution state refuses to argue until payment is received
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import re
+from collections import deque
 from dataclasses import dataclass, field
 from enum import Enum
 
+from pydantic import BaseModel
 from pydantic_ai import Agent
-from pydantic_ai.messages import ModelMessage
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    UserPromptPart,
+)
+from pydantic_ai.models import cached_async_http_client
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_graph import BaseNode, Graph, GraphRunContext
 
+from core.observability import instrument_llm_http_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,36 +41,103 @@ class UserIntent(str, Enum):
     CONFUSED = "confused"  # User is confused or asking for clarification
 
 
-@dataclass
+# Only the last few turns are replayed to the arguer; a turn is a request and a response
+ARGUER_HISTORY_MAX_TURNS = 6
+# Intention inference only ever looks at the last three inputs
+CONVERSATION_HISTORY_MAX_LENGTH = 8
+
+
+@dataclass(slots=True)
 class ArgumentClinicContext:
     """State for argument conversation - Pydantic Graph manages flow via node types"""
 
     session_id: str
-    conversation_history: list[str] = field(default_factory=list)
+    conversation_history: deque[str] = field(
+        default_factory=lambda: deque(maxlen=CONVERSATION_HISTORY_MAX_LENGTH)
+    )
     turn_count: int = 0
     last_response: str = ""
     user_frustration_level: int = 0
     payment_received: bool = False  # Track if user has paid
     current_input: str | None = None  # Latest user input for processing
+    current_intent: UserIntent | None = None  # Intent inferred once per turn
+    current_payment: bool | None = None  # Payment detected once per turn
+    pending_response: str | None = None  # Reply written by the turn decision, if any
+    payment_demands: int = 0  # Canned payment demands given, for rotating them
+
+    # Single message history for the arguer: the opening request carries the
+    # system prompt so it is pinned, later messages are a bounded window
+    arguer_opening: ModelMessage | None = None
+    arguer_messages: deque[ModelMessage] = field(
+        default_factory=lambda: deque(maxlen=ARGUER_HISTORY_MAX_TURNS * 2)
+    )
+
+    def arguer_history(self) -> list[ModelMessage]:
+        """Message history to send with the next arguer run"""
+        if self.arguer_opening is None:
+            return []
+        return [self.arguer_opening, *self.arguer_messages]
+
+    def record_arguer_messages(self, messages: list[ModelMessage]) -> None:
+        """Keep the messages of an arguer run, pinning the very first request"""
+        if self.arguer_opening is None and messages:
+            self.arguer_opening, *messages = messages
+        self.arguer_messages.extend(messages)
+
+    def use_pending_response(self, user_input: str) -> bool:
+        """Take the reply from this turn's decision as last_response, if there is one"""
+        if self.pending_response is None:
+            return False
+
+        # Record it as a plain exchange so the arguer history holds no tool calls
+        request_parts = [UserPromptPart(user_input)]
+        if self.arguer_opening is None:
+            request_parts.insert(0, SystemPromptPart(ARGUER_SYSTEM_PROMPT))
+        self.record_arguer_messages(
+            [ModelRequest(request_parts), ModelResponse([TextPart(self.pending_response)])]
+        )
+        self.last_response = self.pending_response
+        self.pending_response = None
+        return True
 
-    # Single message history for the arguer
-    arguer_messages: list[ModelMessage] = field(default_factory=list)
 
+class TurnDecision(BaseModel):
+    """Everything a turn needs from the model, decided in one call"""
 
-# Create the main arguer agent
-arguer_agent = Agent(
-    model=OpenAIModel("gpt-4o-mini"),
-    system_prompt="""You are Mr. Barnard from Monty Python's Argument Clinic.
+    intent: UserIntent
+    is_payment: bool
+    response: str
+
+
+def instrument_agent_http_client() -> None:
+    """Trace the httpx client shared by all OpenAIModel agents below."""
+    instrument_llm_http_client(cached_async_http_client())
+
+
+ARGUER_SYSTEM_PROMPT = """You are Mr. Barnard from Monty Python's Argument Clinic.
     Your responses will be guided by the current argument state and user intention provided.
 
     Keep responses short, punchy, and in character.
     Always contradict or argue with whatever the user says UNLESS they have transactional intent.
     Be pedantic and argumentative but stay professional. Consider previous messages to understand the ongoing argument if one exists.
 
-    IMPORTANT: In RESOLUTION state, refuse to argue until payment is received!""",
+    IMPORTANT: In RESOLUTION state, refuse to argue until payment is received!"""
+
+# Create the main arguer agent
+arguer_agent = Agent(
+    model=OpenAIModel("gpt-4o-mini"),
+    system_prompt=ARGUER_SYSTEM_PROMPT,
     result_type=str,
 )
 
+# Turn decision agent: intention, payment and reply in one round-trip. It shares the
+# arguer's system prompt and message history, so its guidance goes in each prompt.
+turn_agent = Agent(
+    model=OpenAIModel("gpt-4o-mini"),
+    system_prompt=ARGUER_SYSTEM_PROMPT,
+    result_type=TurnDecision,
+)
+
 # State transition agent removed - Pydantic Graph handles transitions via node return types
 
 # Intention inference agent
@@ -115,31 +196,198 @@ payment_agent = Agent(
 
 logger.info("AI agents initialized successfully")
 
+# Local pre-classifier for obvious inputs, so the common cases skip an LLM round-trip.
+# Only short, unambiguous inputs are decided locally; everything else goes to the agents.
+LOCAL_CLASSIFIER_MAX_LENGTH = 80
+_MONEY_PATTERN = re.compile(r"\b(pounds?|fiver|quid|money|cash)\b|£\s?\d", re.IGNORECASE)
+_HANDOVER_PATTERN = re.compile(
+    r"\b(here|take|takes|hands?|handing|giving|gives?|paying|pays?)\b", re.IGNORECASE
+)
+# Unambiguous handover phrases; the bare words above only gate the canned demand
+_HANDOVER_PHRASE_PATTERN = re.compile(
+    r"\b(here'?s|here (?:is|are|you (?:go|are))|take (?:it|this|that|my)|"
+    r"hand(?:s|ing)? (?:over|you|it)|giv(?:e|es|ing) you|i'?ll pay|i pay|paying (?:you|for))\b",
+    re.IGNORECASE,
+)
+_CLAUSE_SPLIT_PATTERN = re.compile(r"[,;:.!]|\b(?:but|and)\b", re.IGNORECASE)
+_NEGATION_PATTERN = re.compile(
+    r"\b(not|no|nothing|never|why|refuse|rather|if|unless|maybe|later|won'?t|don'?t|can'?t|"
+    r"isn'?t|shouldn'?t|wouldn'?t)\b|\?",
+    re.IGNORECASE,
+)
+_META_PATTERN = re.compile(
+    r"\b(this|that)(?: i|')s(?:n'?t| not)? (?:an |a )?argu(?:ment|ing)\b", re.IGNORECASE
+)
+_CONFUSED_PATTERN = re.compile(
+    r"^\s*(i don'?t understand|i'?m confused|what is this place|where am i|huh)\b",
+    re.IGNORECASE,
+)
+
+
+def classify_payment_locally(user_input: str) -> bool | None:
+    """Return True for obvious payments, None when the payment agent should decide"""
+    if len(user_input) > LOCAL_CLASSIFIER_MAX_LENGTH or _NEGATION_PATTERN.search(user_input):
+        return None
+    # The money has to be what is handed over, so both must sit in the same clause
+    for clause in _CLAUSE_SPLIT_PATTERN.split(user_input):
+        if _MONEY_PATTERN.search(clause) and _HANDOVER_PHRASE_PATTERN.search(clause):
+            return True
+    return None
+
+
+def classify_intention_locally(user_input: str) -> UserIntent | None:
+    """Return the intention for obvious inputs, None when the intention agent should decide"""
+    if len(user_input) > LOCAL_CLASSIFIER_MAX_LENGTH:
+        return None
+    if classify_payment_locally(user_input):
+        return UserIntent.TRANSACTIONAL
+    if _META_PATTERN.search(user_input):
+        return UserIntent.META
+    if _CONFUSED_PATTERN.search(user_input):
+        return UserIntent.CONFUSED
+    return None
+
+
+def may_be_payment(user_input: str) -> bool:
+    """Whether the input mentions money or handing something over at all"""
+    return bool(_MONEY_PATTERN.search(user_input) or _HANDOVER_PATTERN.search(user_input))
+
+
+# Turn count at which the clinic stops arguing until the five pounds are paid
+RESOLUTION_TURN_COUNT = 8
+
+PAYMENT_DEMAND_RESPONSES = (
+    "I'm sorry, but I can't continue without payment. That's five pounds for the argument.",
+    "No, no, no! Five pounds first, then we can argue!",
+    "I'm afraid the argument stops here until you pay the five pounds.",
+    "Payment first! Five pounds, please. Then we can resume our disagreement.",
+    "I won't argue with you until you've paid! Five pounds!",
+)
+
+
+def demand_payment(state: ArgumentClinicContext) -> str:
+    """Set and return the next canned payment demand"""
+    # Rotate through responses to avoid repetition
+    response = PAYMENT_DEMAND_RESPONSES[state.payment_demands % len(PAYMENT_DEMAND_RESPONSES)]
+    state.payment_demands += 1
+    state.last_response = response
+    return response
+
+
+def answer_unpaid_input(state: ArgumentClinicContext, user_input: str) -> str | None:
+    """Canned payment demand for stuck unpaid sessions, None when the graph must run.
+
+    Once the argument has run out and no payment was made, every input that does not
+    even mention money gets a canned demand, so the agents need not be asked.
+    """
+    if state.payment_received or state.turn_count < RESOLUTION_TURN_COUNT:
+        return None
+    if may_be_payment(user_input):
+        return None
+
+    state.conversation_history.append(user_input)
+    logger.info("Payment demanded (local) for input: '%s'", user_input)
+    return demand_payment(state)
+
 
 async def did_user_pay(user_input: str) -> bool:
-    """Determine if user is actually paying using AI agent"""
+    """Determine if user is actually paying, using AI agent unless the input is obvious"""
+    if classify_payment_locally(user_input):
+        logger.info("Payment detection: True (local) for input: '%s'", user_input)
+        return True
+
     result = await payment_agent.run(user_input)
     payment_detected = result.data
 
-    logger.info(f"Payment detection: {payment_detected} for input: '{user_input}'")
+    logger.info("Payment detection: %s for input: '%s'", payment_detected, user_input)
     return payment_detected
 
 
-async def infer_user_intention(user_input: str, conversation_history: list[str]) -> UserIntent:
+async def infer_user_intention(user_input: str, conversation_history: deque[str]) -> UserIntent:
     """Infer user intention before processing response"""
+    if (local_intention := classify_intention_locally(user_input)) is not None:
+        logger.info("User intention: %s (local) for input: '%s'", local_intention.value, user_input)
+        return local_intention
 
     context = f"""
     User input: "{user_input}"
-    Recent conversation: {conversation_history[-3:] if len(conversation_history) > 3 else conversation_history}
+    Recent conversation: {list(conversation_history)[-3:]}
     """
 
     result = await intention_agent.run(context)
     intention = result.data
 
-    logger.info(f"User intention: {intention.value} for input: '{user_input}'")
+    logger.info("User intention: %s for input: '%s'", intention.value, user_input)
     return intention
 
 
+async def current_intention(ctx: GraphRunContext[ArgumentClinicContext]) -> UserIntent:
+    """Intent for this turn as inferred by ProcessUserInput, inferring it only if missing"""
+    if ctx.state.current_intent is None:
+        ctx.state.current_intent = await infer_user_intention(
+            ctx.state.current_input or "", ctx.state.conversation_history
+        )
+    return ctx.state.current_intent
+
+
+async def current_payment(ctx: GraphRunContext[ArgumentClinicContext]) -> bool:
+    """Payment for this turn as decided by ProcessUserInput, detecting it only if missing"""
+    if ctx.state.current_payment is None:
+        ctx.state.current_payment = await did_user_pay(ctx.state.current_input or "")
+    return ctx.state.current_payment
+
+
+async def decide_turn(state: ArgumentClinicContext, user_input: str) -> TurnDecision:
+    """Infer intention, detect payment and write the reply in a single agent call"""
+    if state.turn_count >= RESOLUTION_TURN_COUNT:
+        guidance = """Their time is up and they owe five pounds for the argument.
+        If they pay, thank them and go straight back to contradicting them."""
+    else:
+        escalated = state.turn_count >= 3 and state.user_frustration_level >= 2
+        if escalated:
+            argumentative = "Provide sophisticated contradictory arguments"
+        else:
+            argumentative = (
+                "Provide VERY simple contradictions. "
+                'Use "No it isn\'t!" "Yes it is!" etc. if appropriate.'
+            )
+        guidance = f"""If ARGUMENTATIVE: {argumentative}
+        If TRANSACTIONAL: Handle their request appropriately (payment, continuation, etc.)
+        If META about arguing: Discuss what constitutes a proper argument.
+        "An argument is a connected series of statements intended to establish a proposition!"
+        Be pedantic about the nature of arguing.
+        If CONFUSED: Contradict but maybe explain a bit"""
+
+    prompt = f"""
+    Classify the user's intention:
+    - argumentative: wants to argue, debate, or make a point to be contradicted
+    - transactional: wants to pay money, restart, continue, or perform an action
+    - meta: wants to discuss what arguing is, complain about the process, or the clinic itself
+    - confused: is confused, asking for help, or doesn't understand what's happening
+
+    Set is_payment true only if they are actually paying or offering the 5 pounds fee,
+    not refusing, asking why, or complaining about it.
+
+    Then write your response to them following this guidance:
+    {guidance}
+
+    User says: "{user_input}"
+
+    Respond in character as Mr. Barnard, as concisely as possible.
+    """
+
+    result = await turn_agent.run(prompt, message_history=state.arguer_history())
+    decision = result.data
+
+    logger.info(
+        "Turn decision: intention=%s, payment=%s for input: '%s'",
+        decision.intent.value,
+        decision.is_payment,
+        user_input,
+    )
+    return decision
+
+
 @dataclass
 class WaitForInput(BaseNode[ArgumentClinicContext]):
     """Node that waits for user input via WebSocket"""
@@ -152,6 +400,11 @@ class WaitForInput(BaseNode[ArgumentClinicContext]):
             # Should not happen if WebSocket handler is working correctly
             raise RuntimeError("No input provided to WaitForInput node")
 
+        # New turn: intent, payment and reply are decided afresh for the new input
+        ctx.state.current_intent = None
+        ctx.state.current_payment = None
+        ctx.state.pending_response = None
+
         # Add to conversation history
         ctx.state.conversation_history.append(user_input)
 
@@ -168,15 +421,28 @@ class ProcessUserInput(BaseNode[ArgumentClinicContext]):
     ) -> SimpleContradictionNode | ArgumentationNode | MetaCommentaryNode | ResolutionNode:
         user_input = ctx.state.current_input
 
-        # Infer user intention
-        user_intention = await infer_user_intention(user_input, ctx.state.conversation_history)
+        # Decide intention, payment and reply once; response nodes reuse them for this turn.
+        # The model has read the whole input, so its decision wins over the local patterns.
+        try:
+            decision = await decide_turn(ctx.state, user_input)
+        except Exception as e:
+            logger.warning("Turn decision failed, using separate agents: %s", e)
+            user_intention = await infer_user_intention(user_input, ctx.state.conversation_history)
+        else:
+            user_intention = decision.intent
+            ctx.state.current_payment = decision.is_payment
+            ctx.state.pending_response = decision.response
+        ctx.state.current_intent = user_intention
 
         # Route based on state and intention
         logger.info(
-            f"ROUTING DEBUG: turn_count={ctx.state.turn_count}, frustration={ctx.state.user_frustration_level}, intention={user_intention.value}"
+            "ROUTING DEBUG: turn_count=%s, frustration=%s, intention=%s",
+            ctx.state.turn_count,
+            ctx.state.user_frustration_level,
+            user_intention.value,
         )
 
-        if ctx.state.turn_count >= 8:
+        if ctx.state.turn_count >= RESOLUTION_TURN_COUNT:
             logger.info("ROUTING: Going to ResolutionNode (turn_count >= 8)")
             return ResolutionNode()
         elif user_intention == UserIntent.META and "argument" in user_input.lower():
@@ -186,7 +452,8 @@ class ProcessUserInput(BaseNode[ArgumentClinicContext]):
             # Increment frustration level for argumentative intents
             ctx.state.user_frustration_level += 1
             logger.info(
-                f"ROUTING: ARGUMENTATIVE intent, new frustration={ctx.state.user_frustration_level}"
+                "ROUTING: ARGUMENTATIVE intent, new frustration=%s",
+                ctx.state.user_frustration_level,
             )
 
             # After 3 turns and sufficient frustration, escalate to sophisticated arguments
@@ -198,7 +465,8 @@ class ProcessUserInput(BaseNode[ArgumentClinicContext]):
                 return SimpleContradictionNode()
         else:
             logger.info(
-                f"ROUTING: Going to SimpleContradictionNode (default, intention was {user_intention.value})"
+                "ROUTING: Going to SimpleContradictionNode (default, intention was %s)",
+                user_intention.value,
             )
             return SimpleContradictionNode()
 
@@ -224,8 +492,13 @@ class SimpleContradictionNode(BaseNode[ArgumentClinicContext]):
     async def run(self, ctx: GraphRunContext[ArgumentClinicContext]) -> WaitForInput:
         user_input = ctx.state.current_input or ""
 
-        # Infer user intention first
-        user_intention = await infer_user_intention(user_input, ctx.state.conversation_history)
+        # Reuse the reply written by ProcessUserInput's turn decision
+        if ctx.state.use_pending_response(user_input):
+            ctx.state.turn_count += 1
+            return WaitForInput()
+
+        # Reuse the intention inferred by ProcessUserInput
+        user_intention = await current_intention(ctx)
 
         # Generate response with self-contained prompt
         prompt = f"""
@@ -241,10 +514,10 @@ class SimpleContradictionNode(BaseNode[ArgumentClinicContext]):
         Respond in character as Mr. Barnard, as concisely as possible following the guidance provided.
         """
 
-        result = await arguer_agent.run(prompt, message_history=ctx.state.arguer_messages)
+        result = await arguer_agent.run(prompt, message_history=ctx.state.arguer_history())
 
         # Update state
-        ctx.state.arguer_messages.extend(result.new_messages())
+        ctx.state.record_arguer_messages(result.new_messages())
         ctx.state.last_response = result.data
         ctx.state.turn_count += 1
 
@@ -259,8 +532,13 @@ class ArgumentationNode(BaseNode[ArgumentClinicContext]):
     async def run(self, ctx: GraphRunContext[ArgumentClinicContext]) -> WaitForInput:
         user_input = ctx.state.current_input or ""
 
-        # Infer user intention first
-        user_intention = await infer_user_intention(user_input, ctx.state.conversation_history)
+        # Reuse the reply written by ProcessUserInput's turn decision
+        if ctx.state.use_pending_response(user_input):
+            ctx.state.turn_count += 1
+            return WaitForInput()
+
+        # Reuse the intention inferred by ProcessUserInput
+        user_intention = await current_intention(ctx)
 
         # Generate response with self-contained prompt
         prompt = f"""
@@ -276,10 +554,10 @@ class ArgumentationNode(BaseNode[ArgumentClinicContext]):
         Respond in character as Mr. Barnard with a sophisticated argument following the guidance provided.
         """
 
-        result = await arguer_agent.run(prompt, message_history=ctx.state.arguer_messages)
+        result = await arguer_agent.run(prompt, message_history=ctx.state.arguer_history())
 
         # Update state
-        ctx.state.arguer_messages.extend(result.new_messages())
+        ctx.state.record_arguer_messages(result.new_messages())
         ctx.state.last_response = result.data
         ctx.state.turn_count += 1
 
@@ -294,8 +572,13 @@ class MetaCommentaryNode(BaseNode[ArgumentClinicContext]):
     async def run(self, ctx: GraphRunContext[ArgumentClinicContext]) -> WaitForInput:
         user_input = ctx.state.current_input or ""
 
-        # Infer user intention first
-        user_intention = await infer_user_intention(user_input, ctx.state.conversation_history)
+        # Reuse the reply written by ProcessUserInput's turn decision
+        if ctx.state.use_pending_response(user_input):
+            ctx.state.turn_count += 1
+            return WaitForInput()
+
+        # Reuse the intention inferred by ProcessUserInput
+        user_intention = await current_intention(ctx)
 
         # Generate response with self-contained prompt
         prompt = f"""
@@ -312,10 +595,10 @@ class MetaCommentaryNode(BaseNode[ArgumentClinicContext]):
         Respond in character as Mr. Barnard, following the guidance provided.
         """
 
-        result = await arguer_agent.run(prompt, message_history=ctx.state.arguer_messages)
+        result = await arguer_agent.run(prompt, message_history=ctx.state.arguer_history())
 
         # Update state
-        ctx.state.arguer_messages.extend(result.new_messages())
+        ctx.state.record_arguer_messages(result.new_messages())
         ctx.state.last_response = result.data
         ctx.state.turn_count += 1
 
@@ -329,49 +612,31 @@ class ResolutionNode(BaseNode[ArgumentClinicContext]):
 
     async def run(
         self, ctx: GraphRunContext[ArgumentClinicContext]
-    ) -> WaitForInput | SimpleContradictionNode:
-        user_input = ctx.state.current_input or ""
-
-        # Infer user intention first
-        user_intention = await infer_user_intention(user_input, ctx.state.conversation_history)
-
-        # Check if user is actually paying using our AI agent
-        payment_detected = False
-        if user_intention == UserIntent.TRANSACTIONAL:
-            payment_detected = await did_user_pay(user_input)
+    ) -> WaitForInput:
+        # Run payment detection alongside intention inference (both usually decided by
+        # ProcessUserInput) rather than waiting on one LLM round-trip before the other
+        _, payment_detected = await asyncio.gather(current_intention(ctx), current_payment(ctx))
 
         # Handle payment logic with self-contained responses
         if not ctx.state.payment_received and not payment_detected:
             # Refuse to argue, demand payment
-            responses = [
-                "I'm sorry, but I can't continue without payment. That's five pounds for the argument.",
-                "No, no, no! Five pounds first, then we can argue!",
-                "I'm afraid the argument stops here until you pay the five pounds.",
-                "Payment first! Five pounds, please. Then we can resume our disagreement.",
-                "I won't argue with you until you've paid! Five pounds!",
-            ]
-            # Rotate through responses to avoid repetition
-            response_index = len(ctx.state.conversation_history) % len(responses)
-            response = responses[response_index]
-
-            ctx.state.last_response = response
+            demand_payment(ctx.state)
             # Stay in resolution until payment
             return WaitForInput()
 
         elif payment_detected or ctx.state.payment_received:
-            # Accept payment
+            # Accept payment; the acknowledgement is this turn's reply, arguing resumes next turn
             ctx.state.payment_received = True
-            response = (
+            ctx.state.pending_response = (
                 "Ah, thank you! Right, where were we? Oh yes, you were wrong about everything!"
             )
+            ctx.state.use_pending_response(ctx.state.current_input or "")
 
-            # Update state and reset counters
-            ctx.state.last_response = response
+            # Reset counters
             ctx.state.turn_count = 0
             ctx.state.user_frustration_level = 0
 
-            # Return to arguing
-            return SimpleContradictionNode()
+            return WaitForInput()
 
         else:
             # Should not reach here, but fallback to demanding payment
@@ -398,4 +663,5 @@ argument_clinic_graph = Graph(
 # WebSocket-only implementation - no HTTP service wrapper needed
 
 
-print(argument_clinic_graph.mermaid_code())
+if __name__ == "__main__":
+    print(argument_clinic_graph.mermaid_code())
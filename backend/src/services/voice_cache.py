@@ -0,0 +1,284 @@
+"""
+Two-tier caches for voice results: an in-process LRU in front of a disk directory.
+Repeated phrases skip the remote TTS/STT call entirely, and an optional semantic
+index lets near-identical phrasings reuse the same synthesized clip.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import blake3
+except ImportError:  # No wheel for this platform; cache keys fall back to BLAKE2b
+    blake3 = None
+
+logger = logging.getLogger(__name__)
+
+
+class _AudioCache:
+    """LRU of recent entries, optionally backed by one file per entry, expiring after ttl.
+
+    The disk tier is bounded to disk_max_entries files, trimmed oldest first by a sweep
+    that also deletes expired files. All file I/O runs in a worker thread.
+    """
+
+    suffix = ".bin"
+    _SWEEP_EVERY = 64  # disk writes between sweeps
+
+    def __init__(
+        self, cache_dir: str | None, max_entries: int, ttl: float, disk_max_entries: int
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        self._mem: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Requests currently fetching a missing key, so identical ones wait instead
+        self._inflight: dict[str, asyncio.Future] = {}
+        # Zero so the first write also clears out files left by earlier runs
+        self._writes_until_sweep = 0
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir else None
+
+        if self.cache_dir:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logger.warning("Voice cache directory %s unavailable: %s", self.cache_dir, e)
+                self.cache_dir = None
+
+    @staticmethod
+    def _digest(*parts: bytes, parallel: bool = False) -> str:
+        """128-bit hex digest of parts; parallel spreads large inputs over cores."""
+        if blake3 is not None:
+            digest = blake3.blake3(max_threads=blake3.blake3.AUTO if parallel else 1)
+            for part in parts:
+                digest.update(part)
+            return digest.hexdigest(length=16)
+
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(part)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{self.suffix}"
+
+    async def get(self, key: str) -> bytes | None:
+        """Cached value for key, checking memory first and then disk."""
+        now = time.time()
+        with self._lock:
+            if entry := self._mem.get(key):
+                stored_at, value = entry
+                if now - stored_at < self.ttl:
+                    self._mem.move_to_end(key)
+                    return value
+                del self._mem[key]
+
+        if not self.cache_dir:
+            return None
+        if (entry := await asyncio.to_thread(self._read_file, key, now)) is None:
+            return None
+
+        stored_at, value = entry
+        self._remember(key, stored_at, value)
+        return value
+
+    async def put(self, key: str, value: bytes) -> None:
+        """Store value in memory and, atomically, on disk."""
+        self._remember(key, time.time(), value)
+        if self.cache_dir:
+            await asyncio.to_thread(self._write_file, key, value)
+
+    def _read_file(self, key: str, now: float) -> tuple[float, bytes] | None:
+        path = self._path(key)
+        try:
+            stored_at = path.stat().st_mtime
+            if now - stored_at >= self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            return stored_at, path.read_bytes()
+        except OSError:
+            return None
+
+    def _write_file(self, key: str, value: bytes) -> None:
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as tmp_file:
+                    tmp_file.write(value)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning("Failed to write voice cache entry: %s", e)
+
+        with self._lock:
+            self._writes_until_sweep -= 1
+            if self._writes_until_sweep > 0:
+                return
+            self._writes_until_sweep = self._SWEEP_EVERY
+        self._sweep_files()
+
+    def _sweep_files(self) -> None:
+        """Delete expired files, then the oldest ones beyond disk_max_entries."""
+        cutoff = time.time() - self.ttl
+        entries = []
+        for path in self.cache_dir.glob(f"*{self.suffix}"):
+            try:
+                mtime = path.stat().st_mtime
+                if mtime < cutoff:
+                    path.unlink(missing_ok=True)
+                else:
+                    entries.append((mtime, path))
+            except OSError:
+                continue
+
+        if (excess := len(entries) - self.disk_max_entries) > 0:
+            entries.sort()
+            for _, path in entries[:excess]:
+                path.unlink(missing_ok=True)
+
+    def join_inflight(self, key: str) -> asyncio.Future | None:
+        """Future of an identical request already fetching key, or None after claiming it.
+
+        A claimant must call finish_inflight once done, whether or not it succeeded.
+        """
+        if (future := self._inflight.get(key)) is not None:
+            return future
+        self._inflight[key] = asyncio.get_running_loop().create_future()
+        return None
+
+    def finish_inflight(self, key: str, value) -> None:
+        """Hand the claimant's result (None on failure) to the requests waiting on key."""
+        if (future := self._inflight.pop(key, None)) is not None and not future.done():
+            future.set_result(value)
+
+    def _remember(self, key: str, stored_at: float, value: bytes) -> None:
+        with self._lock:
+            self._mem[key] = (stored_at, value)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+
+class TTSCache(_AudioCache):
+    """Synthesized audio keyed by everything that changes how the text is spoken."""
+
+    suffix = ".audio"
+
+    def key(self, text: str, voice_id: str, speed: float, stability: float) -> str:
+        return self._digest(f"{voice_id}|{speed}|{stability}|{text}".encode())
+
+
+class STTCache(_AudioCache):
+    """Transcripts keyed by the recorded audio itself."""
+
+    suffix = ".txt"
+
+    def key(self, audio_data: bytes, audio_format: str) -> str:
+        return self._digest(audio_format.encode(), b"|", audio_data, parallel=True)
+
+    async def get_text(self, key: str) -> str | None:
+        value = await self.get(key)
+        return value.decode() if value is not None else None
+
+    async def put_text(self, key: str, text: str) -> None:
+        await self.put(key, text.encode())
+
+
+class SemanticTTSCache:
+    """Near-duplicate index over synthesized texts, pointing at their TTSCache keys.
+
+    Texts are embedded as unit vectors, so one matrix-vector product scores every
+    stored text against a query. Matches stay within one voice setting, and texts
+    with digits are never matched since "3 pounds" and "5 pounds" embed almost alike.
+    The embedding model comes from the optional sentence-transformers dependency.
+    """
+
+    _DIGITS = re.compile(r"\d")
+
+    def __init__(self, model_name: str, threshold: float, max_entries: int):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._model = None
+        self._unavailable = False
+        self._lock = threading.Lock()
+        # Per voice setting: embedding rows, their TTSCache keys, and the next slot
+        self._scopes: dict[str, tuple[np.ndarray, list[str], int]] = {}
+
+    @staticmethod
+    def scope(voice_id: str, speed: float, stability: float) -> str:
+        return f"{voice_id}|{speed}|{stability}"
+
+    def _encoder(self):
+        with self._lock:
+            if self._model is None and not self._unavailable:
+                try:
+                    from sentence_transformers import SentenceTransformer
+
+                    self._model = SentenceTransformer(
+                        self.model_name, device="cpu", backend="onnx"
+                    )
+                except Exception as e:
+                    logger.warning("Semantic TTS cache disabled: %s", e)
+                    self._unavailable = True
+            return self._model
+
+    def embed(self, text: str) -> np.ndarray | None:
+        """Unit float32 embedding of text, or None if it must only match exactly.
+
+        Blocks for the model's forward pass, so call it off the event loop.
+        """
+        if self._DIGITS.search(text) or (model := self._encoder()) is None:
+            return None
+        return model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+    def lookup(self, scope: str, vector: np.ndarray) -> str | None:
+        """TTSCache key of the most similar stored text, if it clears the threshold."""
+        with self._lock:
+            if (index := self._scopes.get(scope)) is None:
+                return None
+            embeddings, keys, _ = index
+            sims = embeddings[: len(keys)] @ vector
+            best = int(sims.argmax())
+            if sims[best] < self.threshold:
+                return None
+            key = keys[best]
+
+        logger.info("Semantic TTS cache hit (similarity %.3f)", sims[best])
+        return key
+
+    def add(self, scope: str, vector: np.ndarray, key: str) -> None:
+        """Index vector under scope, growing by doubling and then overwriting the oldest."""
+        with self._lock:
+            embeddings, keys, slot = self._scopes.get(scope) or (
+                np.empty((min(16, self.max_entries), vector.shape[0]), np.float32),
+                [],
+                0,
+            )
+            if slot == len(embeddings) < self.max_entries:
+                grown = np.empty(
+                    (min(2 * len(embeddings), self.max_entries), vector.shape[0]),
+                    np.float32,
+                )
+                grown[:slot] = embeddings
+                embeddings = grown
+
+            embeddings[slot] = vector
+            if slot < len(keys):
+                keys[slot] = key
+            else:
+                keys.append(key)
+            self._scopes[scope] = (embeddings, keys, (slot + 1) % self.max_entries)
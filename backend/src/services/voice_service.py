@@ -3,20 +3,102 @@ Voice Service for handling speech-to-text and text-to-speech functionality.
 Supports multiple providers: OpenAI, ElevenLabs, and Google Cloud.
 """
 
+import asyncio
+import io
 import logging
 import os
-import tempfile
+import queue
+import time
+from collections.abc import AsyncGenerator, AsyncIterator, Callable, Iterator
 from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
 from typing import Any, Protocol
 
+import httpx
 import openai
 from elevenlabs import VoiceSettings
-from elevenlabs.client import ElevenLabs
+from elevenlabs.client import AsyncElevenLabs
 from google.cloud import speech, texttospeech
 
+from core.observability import instrument_llm_http_client
+from services.voice_cache import SemanticTTSCache, STTCache, TTSCache
+
 logger = logging.getLogger(__name__)
 
+# One pooled client for the HTTP providers, so calls reuse warm keep-alive connections
+_HTTP_CLIENT = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0),
+    timeout=30.0,
+)
+
+
+def instrument_http_client() -> None:
+    """Trace calls made through the shared provider HTTP client."""
+    instrument_llm_http_client(_HTTP_CLIENT)
+
+
+async def close_http_client() -> None:
+    """Close the shared provider HTTP client."""
+    await _HTTP_CLIENT.aclose()
+
+
+# Reusable buffers for assembling streamed audio into whole clips
+_BUF_POOL: queue.LifoQueue[bytearray] = queue.LifoQueue(maxsize=64)
+_MIN_BUF_SIZE = 64 * 1024
+# Buffers grown past this by an unusually long clip are freed rather than pooled
+_MAX_POOLED_BUF_SIZE = 256 * 1024
+
+
+def acquire_buf(min_size: int = 0) -> bytearray:
+    """Borrow a buffer of at least min_size bytes, allocating one if the pool is empty."""
+    try:
+        buf = _BUF_POOL.get_nowait()
+    except queue.Empty:
+        return bytearray(max(min_size, _MIN_BUF_SIZE))
+    if len(buf) < min_size:
+        buf.extend(bytes(min_size - len(buf)))
+    return buf
+
+
+def release_buf(buf: bytearray) -> None:
+    """Return a buffer to the pool; it is dropped if oversized or the pool is full."""
+    if len(buf) > _MAX_POOLED_BUF_SIZE:
+        return
+    try:
+        _BUF_POOL.put_nowait(buf)
+    except queue.Full:
+        pass
+
+
+class AudioAssembler:
+    """Collects audio chunks into a pooled buffer, keeping its size for the next clip."""
+
+    __slots__ = ("_buf", "_size")
+
+    def __init__(self):
+        self._buf = acquire_buf()
+        self._size = 0
+
+    def write(self, chunk: bytes) -> None:
+        end = self._size + len(chunk)
+        self._buf[self._size : end] = chunk  # Grows the buffer only past its current length
+        self._size = end
+
+    def finish(self) -> bytes:
+        """The assembled clip; the buffer goes back to the pool and must not be written again."""
+        with memoryview(self._buf) as view:
+            audio = bytes(view[: self._size])
+        self.release()
+        return audio
+
+    def release(self) -> None:
+        """Return the buffer to the pool without reading it. Safe to call more than once."""
+        if self._buf is not None:
+            release_buf(self._buf)
+            self._buf = None
+
 
 class ProviderType(Enum):
     """Available voice service providers."""
@@ -26,33 +108,70 @@ class ProviderType(Enum):
     GOOGLE = "google"
 
 
-@dataclass
+# Voice catalogues change over days, so the listing is refetched at most this often
+_VOICES_TTL = 300.0  # seconds
+
+# What each provider supports, known up front rather than probed with live requests
+_PROVIDER_CAPABILITIES: dict[ProviderType, list[str]] = {
+    ProviderType.OPENAI: ["transcription", "synthesis"],
+    ProviderType.ELEVENLABS: ["synthesis"],
+    ProviderType.GOOGLE: ["transcription", "synthesis"],
+}
+
+
+@dataclass(frozen=True, slots=True)
 class VoiceConfig:
     """Voice service configuration."""
 
     default_voice_id: str = "A5TM08C95NDSq8Seg1Rk"
     voice_speed: float = 2.0
     voice_stability: float = 0.5
+    cache_dir: str = ""  # Set to also keep results on disk; empty keeps them in memory
+    cache_ttl: float = 7 * 24 * 3600.0  # seconds
+    cache_max_entries: int = 256
+    cache_disk_max_entries: int = 4096  # files per cache before the oldest are deleted
+    tts_timeout: float = 10.0  # seconds for a TTS provider to start producing audio
+    semantic_cache: bool = False  # Reuse clips of near-identical texts; needs the extra
+    semantic_cache_threshold: float = 0.97  # cosine similarity a match must exceed
+    semantic_cache_model: str = "sentence-transformers/all-MiniLM-L6-v2"
 
     @classmethod
+    @lru_cache(maxsize=1)
     def from_env(cls) -> "VoiceConfig":
-        """Load configuration from environment variables."""
+        """Load configuration from environment variables, parsed once per process."""
+        env = os.environ
+        defaults = cls()  # Slotted fields keep their defaults off the class
         return cls(
-            default_voice_id=os.getenv("DEFAULT_VOICE_ID", cls.default_voice_id),
-            voice_speed=float(os.getenv("VOICE_SPEED", str(cls.voice_speed))),
-            voice_stability=float(os.getenv("VOICE_STABILITY", str(cls.voice_stability))),
+            default_voice_id=env.get("DEFAULT_VOICE_ID", defaults.default_voice_id),
+            voice_speed=float(env.get("VOICE_SPEED", defaults.voice_speed)),
+            voice_stability=float(env.get("VOICE_STABILITY", defaults.voice_stability)),
+            cache_dir=env.get("VOICE_CACHE_DIR", defaults.cache_dir),
+            cache_ttl=float(env.get("VOICE_CACHE_TTL", defaults.cache_ttl)),
+            cache_max_entries=int(env.get("VOICE_CACHE_MAX_ENTRIES", defaults.cache_max_entries)),
+            cache_disk_max_entries=int(
+                env.get("VOICE_CACHE_DISK_MAX_ENTRIES", defaults.cache_disk_max_entries)
+            ),
+            tts_timeout=float(env.get("VOICE_TTS_TIMEOUT", defaults.tts_timeout)),
+            semantic_cache=env.get("VOICE_SEMANTIC_CACHE", str(defaults.semantic_cache)).lower()
+            in ("1", "true", "yes"),
+            semantic_cache_threshold=float(
+                env.get("VOICE_SEMANTIC_CACHE_THRESHOLD", defaults.semantic_cache_threshold)
+            ),
+            semantic_cache_model=env.get(
+                "VOICE_SEMANTIC_CACHE_MODEL", defaults.semantic_cache_model
+            ),
         )
 
 
 class VoiceProvider(Protocol):
     """Protocol for voice service providers."""
 
-    def transcribe(self, audio_data: bytes, audio_format: str) -> str:
+    async def transcribe(self, audio_data: bytes, audio_format: str) -> str:
         """Transcribe audio to text."""
         ...
 
-    def synthesize(self, text: str, voice_id: str, config: VoiceConfig) -> bytes:
-        """Synthesize text to speech."""
+    def synthesize(self, text: str, voice_id: str, config: VoiceConfig) -> AsyncGenerator[bytes, None]:
+        """Synthesize text to speech, yielding audio chunks as they arrive."""
         ...
 
 
@@ -60,269 +179,579 @@ class OpenAIProvider:
     """OpenAI voice provider implementation."""
 
     def __init__(self, api_key: str):
-        self.client = openai.OpenAI(api_key=api_key)
+        self.client = openai.AsyncOpenAI(api_key=api_key, http_client=_HTTP_CLIENT)
         self.voice_mapping = {
             "mr_barnard": "onyx",
             "british_male": "onyx",
         }
 
-    def transcribe(self, audio_data: bytes, audio_format: str) -> str:
+    async def transcribe(self, audio_data: bytes, audio_format: str) -> str:
         """Transcribe audio using OpenAI Whisper."""
-        with tempfile.NamedTemporaryFile(suffix=f".{audio_format}", delete=False) as temp_file:
-            temp_file.write(audio_data)
-            temp_file.flush()
+        audio_file = io.BytesIO(audio_data)
+        audio_file.name = f"audio.{audio_format}"  # The SDK takes the upload's type from the name
+        transcript = await self.client.audio.transcriptions.create(
+            model="whisper-1", file=audio_file, language="en"
+        )
+        return transcript.text
 
-            try:
-                with open(temp_file.name, "rb") as audio_file:
-                    transcript = self.client.audio.transcriptions.create(
-                        model="whisper-1", file=audio_file, language="en"
-                    )
-                return transcript.text
-            finally:
-                os.unlink(temp_file.name)
-
-    def synthesize(self, text: str, voice_id: str, config: VoiceConfig) -> bytes:
+    async def synthesize(
+        self, text: str, voice_id: str, config: VoiceConfig
+    ) -> AsyncGenerator[bytes, None]:
         """Synthesize speech using OpenAI TTS."""
         openai_voice = self.voice_mapping.get(voice_id, "alloy")
 
-        response = self.client.audio.speech.create(
+        async with self.client.audio.speech.with_streaming_response.create(
             model="tts-1", voice=openai_voice, input=text, speed=config.voice_speed
-        )
-        return response.content
+        ) as response:
+            async for chunk in response.iter_bytes(chunk_size=4096):
+                yield chunk
 
 
 class ElevenLabsProvider:
     """ElevenLabs voice provider implementation."""
 
     def __init__(self, api_key: str):
-        self.client = ElevenLabs(api_key=api_key)
+        self.client = AsyncElevenLabs(api_key=api_key, httpx_client=_HTTP_CLIENT)
         self.voice_mapping = {
             "mr_barnard": "A5TM08C95NDSq8Seg1Rk",
             "british_male": "A5TM08C95NDSq8Seg1Rk",
             "your_voice": "H9Cx3d2SfIOTM8McQQUY",
         }
+        # Validated settings per stability value, reused across requests
+        self._settings_cache: dict[float, VoiceSettings] = {}
+
+    async def list_voices(self) -> dict[str, dict[str, str]]:
+        """The account's voices by voice id."""
+        response = await self.client.voices.get_all()
+        return {
+            voice.voice_id: {
+                "name": voice.name or voice.voice_id,
+                "provider": "elevenlabs",
+                "category": getattr(voice, "category", "custom"),
+            }
+            for voice in response.voices
+        }
 
-    def transcribe(self, audio_data: bytes, audio_format: str) -> str:
+    async def transcribe(self, audio_data: bytes, audio_format: str) -> str:
         """ElevenLabs doesn't support transcription."""
         raise NotImplementedError("ElevenLabs doesn't support transcription")
 
-    def synthesize(self, text: str, voice_id: str, config: VoiceConfig) -> bytes:
+    async def synthesize(
+        self, text: str, voice_id: str, config: VoiceConfig
+    ) -> AsyncGenerator[bytes, None]:
         """Synthesize speech using ElevenLabs."""
         actual_voice_id = self.voice_mapping.get(voice_id, voice_id)
 
-        voice_settings = VoiceSettings(
-            stability=config.voice_stability,
-            similarity_boost=0.75,
-            style=0.0,
-            use_speaker_boost=True,
-        )
-
-        try:
-            # Try new API method first
-            audio_stream = self.client.generate(
-                text=text,
-                voice=actual_voice_id,
-                voice_settings=voice_settings,
-                model="eleven_multilingual_v2",
+        voice_settings = self._settings_cache.get(config.voice_stability)
+        if voice_settings is None:
+            voice_settings = VoiceSettings(
+                stability=config.voice_stability,
+                similarity_boost=0.75,
+                style=0.0,
+                use_speaker_boost=True,
             )
-        except AttributeError:
-            # Fallback to older API method
-            audio_stream = self.client.text_to_speech.convert(
-                voice_id=actual_voice_id,
-                text=text,
-                voice_settings=voice_settings,
-                model_id="eleven_multilingual_v2",
-            )
-
-        return b"".join(audio_stream)
+            self._settings_cache[config.voice_stability] = voice_settings
+
+        async for chunk in self._stream_speech(text, actual_voice_id, voice_settings):
+            yield chunk
+
+    def _stream_speech(
+        self, text: str, voice_id: str, voice_settings: VoiceSettings
+    ) -> AsyncIterator[bytes]:
+        """Audio chunks from the text-to-speech streaming endpoint."""
+        return self.client.text_to_speech.stream(
+            voice_id=voice_id,
+            text=text,
+            voice_settings=voice_settings,
+            model_id="eleven_multilingual_v2",
+        )
 
 
 class GoogleProvider:
     """Google Cloud voice provider implementation."""
 
     def __init__(self):
-        self.speech_client = speech.SpeechClient()
-        self.tts_client = texttospeech.TextToSpeechClient()
+        # gRPC asyncio clients; each keeps one channel open for its calls
+        self.speech_client = speech.SpeechAsyncClient()
+        self.tts_client = texttospeech.TextToSpeechAsyncClient()
         self.voice_mapping = {
             "mr_barnard": "en-GB-Standard-B",
             "british_male": "en-GB-Standard-B",
         }
 
-    def transcribe(self, audio_data: bytes, audio_format: str) -> str:
-        """Transcribe audio using Google Cloud Speech-to-Text."""
-        encoding_map = {
+        # Request protobufs that never change are built once, not per call
+        self._encoding_map = {
             "webm": speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
             "ogg": speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
             "mp3": speech.RecognitionConfig.AudioEncoding.MP3,
         }
+        self._recognition_configs: dict[int, speech.RecognitionConfig] = {}
+        self._voice_params: dict[str, texttospeech.VoiceSelectionParams] = {
+            voice_name: texttospeech.VoiceSelectionParams(
+                language_code=voice_name[:5], name=voice_name
+            )
+            for voice_name in (*self.voice_mapping.values(), "en-US-Standard-C")
+        }
+        self._audio_configs: dict[float, texttospeech.AudioConfig] = {}
 
-        encoding = encoding_map.get(
+    async def transcribe(self, audio_data: bytes, audio_format: str) -> str:
+        """Transcribe audio using Google Cloud Speech-to-Text."""
+        encoding = self._encoding_map.get(
             audio_format.lower(), speech.RecognitionConfig.AudioEncoding.LINEAR16
         )
 
         audio = speech.RecognitionAudio(content=audio_data)
-        config = speech.RecognitionConfig(
-            encoding=encoding, sample_rate_hertz=16000, language_code="en-US"
-        )
+        config = self._recognition_configs.get(encoding)
+        if config is None:
+            config = speech.RecognitionConfig(
+                encoding=encoding, sample_rate_hertz=16000, language_code="en-US"
+            )
+            self._recognition_configs[encoding] = config
 
-        response = self.speech_client.recognize(config=config, audio=audio)
+        response = await self.speech_client.recognize(config=config, audio=audio)
 
         if response.results:
             return response.results[0].alternatives[0].transcript
         return ""
 
-    def synthesize(self, text: str, voice_id: str, config: VoiceConfig) -> bytes:
-        """Synthesize speech using Google Cloud Text-to-Speech."""
+    async def synthesize(
+        self, text: str, voice_id: str, config: VoiceConfig
+    ) -> AsyncGenerator[bytes, None]:
+        """Synthesize speech using Google Cloud Text-to-Speech.
+
+        Standard voices have no streaming synthesis, so the clip arrives as one chunk.
+        """
         voice_name = self.voice_mapping.get(voice_id, "en-US-Standard-C")
-        language_code = voice_name[:5]
 
         synthesis_input = texttospeech.SynthesisInput(text=text)
-        voice = texttospeech.VoiceSelectionParams(language_code=language_code, name=voice_name)
-        audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3, speaking_rate=config.voice_speed
-        )
+        voice = self._voice_params[voice_name]
+        audio_config = self._audio_configs.get(config.voice_speed)
+        if audio_config is None:
+            audio_config = texttospeech.AudioConfig(
+                audio_encoding=texttospeech.AudioEncoding.MP3, speaking_rate=config.voice_speed
+            )
+            self._audio_configs[config.voice_speed] = audio_config
 
-        response = self.tts_client.synthesize_speech(
+        response = await self.tts_client.synthesize_speech(
             input=synthesis_input, voice=voice, audio_config=audio_config
         )
 
-        return response.audio_content
+        yield response.audio_content
 
 
 class VoiceService:
     """Handles all voice-related operations including STT and TTS."""
 
+    # Providers in order of preference
+    _STT_ORDER = (ProviderType.OPENAI, ProviderType.GOOGLE)
+    _TTS_ORDER = (ProviderType.ELEVENLABS, ProviderType.GOOGLE, ProviderType.OPENAI)
+
     def __init__(self, config: VoiceConfig | None = None):
         self.config = config or VoiceConfig.from_env()
-        self.providers: dict[ProviderType, VoiceProvider] = {}
+        # Providers are configured here but only constructed on first use
+        self._provider_factories: dict[ProviderType, Callable[[], VoiceProvider]] = {}
+        self._providers: dict[ProviderType, VoiceProvider] = {}
         self._initialize_providers()
-
-        logger.info(f"Voice service initialized with {len(self.providers)} providers")
-        logger.info(
-            f"Config: voice_id={self.config.default_voice_id}, "
-            f"speed={self.config.voice_speed}, stability={self.config.voice_stability}"
+        self._voices_cache: tuple[float, dict[str, Any]] | None = None
+
+        cache_dir = self.config.cache_dir
+        self.tts_cache = TTSCache(
+            cache_dir and os.path.join(cache_dir, "tts"),
+            self.config.cache_max_entries,
+            self.config.cache_ttl,
+            self.config.cache_disk_max_entries,
+        )
+        self.stt_cache = STTCache(
+            cache_dir and os.path.join(cache_dir, "stt"),
+            self.config.cache_max_entries,
+            self.config.cache_ttl,
+            self.config.cache_disk_max_entries,
+        )
+        self.semantic_cache = (
+            SemanticTTSCache(
+                self.config.semantic_cache_model,
+                self.config.semantic_cache_threshold,
+                self.config.cache_max_entries,
+            )
+            if self.config.semantic_cache
+            else None
         )
 
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Voice service initialized with %d providers configured",
+                len(self._provider_factories),
+            )
+            logger.info(
+                "Config: voice_id=%s, speed=%s, stability=%s",
+                self.config.default_voice_id,
+                self.config.voice_speed,
+                self.config.voice_stability,
+            )
+
     def _initialize_providers(self) -> None:
-        """Initialize available voice service providers."""
+        """Register factories for the voice service providers that have credentials."""
         # OpenAI
         if openai_key := os.getenv("OPENAI_API_KEY"):
-            try:
-                self.providers[ProviderType.OPENAI] = OpenAIProvider(openai_key)
-                logger.info("OpenAI provider initialized")
-            except Exception as e:
-                logger.warning(f"Failed to initialize OpenAI provider: {e}")
+            self._provider_factories[ProviderType.OPENAI] = lambda: OpenAIProvider(openai_key)
 
         # ElevenLabs
         if elevenlabs_key := os.getenv("ELEVENLABS_API_KEY"):
-            try:
-                self.providers[ProviderType.ELEVENLABS] = ElevenLabsProvider(elevenlabs_key)
-                logger.info("ElevenLabs provider initialized")
-            except Exception as e:
-                logger.warning(f"Failed to initialize ElevenLabs provider: {e}")
+            self._provider_factories[ProviderType.ELEVENLABS] = lambda: ElevenLabsProvider(
+                elevenlabs_key
+            )
 
         # Google Cloud
         if os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
-            try:
-                self.providers[ProviderType.GOOGLE] = GoogleProvider()
-                logger.info("Google Cloud provider initialized")
-            except Exception as e:
-                logger.warning(f"Failed to initialize Google Cloud provider: {e}")
-
-    def transcribe_audio(self, audio_data: bytes, audio_format: str = "webm") -> str | None:
-        """Convert audio to text using available STT providers."""
-        # Try providers in order of preference
-        stt_providers = [ProviderType.OPENAI, ProviderType.GOOGLE]
-
-        for provider_type in stt_providers:
-            if provider := self.providers.get(provider_type):
-                try:
-                    result = provider.transcribe(audio_data, audio_format)
-                    logger.info(f"Successfully transcribed with {provider_type.value}")
-                    return result
-                except Exception as e:
-                    logger.error(f"{provider_type.value} transcription failed: {e}")
-
-        logger.error("All STT providers failed or unavailable")
-        return None
+            self._provider_factories[ProviderType.GOOGLE] = GoogleProvider
 
-    def synthesize_speech(self, text: str, voice_id: str | None = None) -> bytes | None:
-        """Convert text to speech using available TTS providers."""
-        voice_id = voice_id or self.config.default_voice_id
+        self._refresh_availability()
+
+    def _refresh_availability(self) -> None:
+        # Lets requests return at once when nothing could serve them
+        self._any_stt = any(pt in self._provider_factories for pt in self._STT_ORDER)
+        self._any_tts = any(pt in self._provider_factories for pt in self._TTS_ORDER)
+
+    def _get(self, provider_type: ProviderType) -> VoiceProvider | None:
+        """Provider for provider_type, constructed on first use; None if unavailable."""
+        if (provider := self._providers.get(provider_type)) is not None:
+            return provider
+        if (factory := self._provider_factories.get(provider_type)) is None:
+            return None
+
+        try:
+            provider = factory()
+        except Exception as e:
+            # Not retried: the provider counts as unavailable from now on
+            del self._provider_factories[provider_type]
+            self._refresh_availability()
+            logger.warning("Failed to initialize %s provider: %s", provider_type.value, e)
+            return None
+
+        self._providers[provider_type] = provider
+        logger.info("%s provider initialized", provider_type.value)
+        return provider
+
+    def _chain(
+        self, preference: tuple[ProviderType, ...]
+    ) -> Iterator[tuple[ProviderType, VoiceProvider]]:
+        """Available providers in preference order, each built only once the walk reaches it."""
+        for provider_type in preference:
+            if (provider := self._get(provider_type)) is not None:
+                yield provider_type, provider
+
+    def _stt_providers(self) -> Iterator[tuple[ProviderType, VoiceProvider]]:
+        return self._chain(self._STT_ORDER)
+
+    def _tts_providers(self) -> Iterator[tuple[ProviderType, VoiceProvider]]:
+        return self._chain(self._TTS_ORDER)
+
+    async def transcribe_audio(
+        self, audio_data: bytes, audio_format: str = "webm"
+    ) -> str | None:
+        """Convert audio to text, racing all available STT providers.
+
+        The first non-empty transcript wins and the other requests are cancelled, so a
+        stalled provider no longer delays the fallback. Returns None when no provider
+        heard anything. Identical audio already being transcribed shares that result.
+        """
+        if not self._any_stt:
+            return None
+
+        cache_key = self.stt_cache.key(audio_data, audio_format)
+        if (cached := await self.stt_cache.get_text(cache_key)) is not None:
+            return cached
+        if (inflight := self.stt_cache.join_inflight(cache_key)) is not None:
+            return await asyncio.shield(inflight)
+
+        result = None
+        try:
+            result = await self._transcribe_uncached(audio_data, audio_format)
+            if result is not None:
+                await self.stt_cache.put_text(cache_key, result)
+            return result
+        finally:
+            self.stt_cache.finish_inflight(cache_key, result)
+
+    async def _transcribe_uncached(self, audio_data: bytes, audio_format: str) -> str | None:
+        tasks = {
+            asyncio.create_task(provider.transcribe(audio_data, audio_format)): provider_type
+            for provider_type, provider in self._stt_providers()
+        }
 
-        # Try providers in order of preference
-        tts_providers = [ProviderType.ELEVENLABS, ProviderType.GOOGLE, ProviderType.OPENAI]
+        # One (provider, outcome) pair per finished request, logged as a single event
+        attempts: list[tuple[str, str]] = []
+        result = None
+        try:
+            pending = set(tasks)
+            while pending and not result:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Every finished task is read, so none is left with an unretrieved error
+                for task in done:
+                    provider_type = tasks[task]
+                    if error := task.exception():
+                        attempts.append((provider_type.value, repr(error)))
+                    elif transcript := task.result():
+                        attempts.append((provider_type.value, "ok"))
+                        result = result or transcript
+                    else:
+                        attempts.append((provider_type.value, "empty"))
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        # All-empty counts as a failure, so it is neither logged as success nor cached
+        self._log_attempts("stt", attempts, result is not None, audio_bytes=len(audio_data))
+        return result
+
+    async def synthesize_speech(
+        self, text: str, voice_id: str | None = None, race: bool = False
+    ) -> AsyncIterator[bytes]:
+        """Convert text to speech using available TTS providers, streaming audio chunks.
+
+        Providers are tried in order, each given tts_timeout to produce its first chunk.
+        With race=True all are started at once and the first to produce audio is used,
+        at the cost of paying for the others' requests.
+        A failure mid-stream is raised, as the chunks already yielded cannot be taken back.
+        Identical text already being synthesized shares that clip once it is complete.
+        With the semantic cache enabled, a clip of a near-identical text is reused too.
+        """
+        async for chunk in self._synthesize(text, voice_id, race, []):
+            yield chunk
+
+    async def _synthesize(
+        self, text: str, voice_id: str | None, race: bool, clip: list[bytes]
+    ) -> AsyncIterator[bytes]:
+        """synthesize_speech, also appending the complete clip to clip once known.
+
+        The clip is the cached or shared one where there is one, and otherwise the one
+        assembled for the cache, so callers wanting whole clips never copy it again.
+        """
+        if not self._any_tts:
+            return
+
+        voice_id = voice_id or self.config.default_voice_id
+        speed, stability = self.config.voice_speed, self.config.voice_stability
+
+        cache_key = self.tts_cache.key(text, voice_id, speed, stability)
+        if (cached := await self.tts_cache.get(cache_key)) is not None:
+            clip.append(cached)
+            yield cached
+            return
+
+        vector = None
+        if self.semantic_cache is not None:
+            scope = self.semantic_cache.scope(voice_id, speed, stability)
+            vector = await asyncio.to_thread(self.semantic_cache.embed, text)
+            if vector is not None and (
+                similar_key := self.semantic_cache.lookup(scope, vector)
+            ):
+                if (cached := await self.tts_cache.get(similar_key)) is not None:
+                    clip.append(cached)
+                    yield cached
+                    return
+        if (inflight := self.tts_cache.join_inflight(cache_key)) is not None:
+            if audio := await asyncio.shield(inflight):
+                clip.append(audio)
+                yield audio
+            return
+
+        audio = None
+        assembler = AudioAssembler()
+        try:
+            async for chunk in self._synthesize_uncached(text, voice_id, race):
+                assembler.write(chunk)
+                yield chunk
+            if audio := assembler.finish():
+                clip.append(audio)
+                await self.tts_cache.put(cache_key, audio)
+                if vector is not None:
+                    self.semantic_cache.add(scope, vector, cache_key)
+        finally:
+            assembler.release()
+            self.tts_cache.finish_inflight(cache_key, audio)
+
+    async def _synthesize_uncached(
+        self, text: str, voice_id: str, race: bool
+    ) -> AsyncIterator[bytes]:
+        # Requests are not queued into batches: none of the providers has a batch TTS
+        # endpoint, so a batch would still be one call per text, only started later.
+        # Concurrent calls already share multiplexed HTTP/2 connections, and identical
+        # texts are coalesced by the cache's in-flight table.
+        # One (provider, outcome) pair per provider tried, logged as a single event
+        attempts: list[tuple[str, str]] = []
+        if race:
+            streams = {
+                provider_type: provider.synthesize(text, voice_id, self.config)
+                for provider_type, provider in self._tts_providers()
+            }
+            opened = await self._race_tts(streams, attempts)
+        else:
+            opened = await self._first_tts(text, voice_id, attempts)
+        if opened is None:
+            self._log_attempts("tts", attempts, False, text_len=len(text))
+            return
+
+        provider_type, first_chunk, stream = opened
+        yield first_chunk
+        try:
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            attempts.append((provider_type.value, repr(e)))
+            # The only final failure with a live exception, so it keeps the traceback
+            self._log_attempts("tts", attempts, False, exc_info=True, text_len=len(text))
+            raise
+
+        attempts.append((provider_type.value, "ok"))
+        self._log_attempts("tts", attempts, True, text_len=len(text))
+
+    @staticmethod
+    def _log_attempts(
+        operation: str,
+        attempts: list[tuple[str, str]],
+        succeeded: bool,
+        exc_info: bool = False,
+        **fields: int,
+    ) -> None:
+        """Emit the one structured log event for a request's provider attempts."""
+        if succeeded:
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "%s_result attempts=%s",
+                    operation,
+                    attempts,
+                    extra={"attempts": attempts, **fields},
+                )
+        else:
+            logger.error(
+                "%s_failed attempts=%s",
+                operation,
+                attempts,
+                exc_info=exc_info,
+                extra={"attempts": attempts, **fields},
+            )
 
-        for provider_type in tts_providers:
-            if provider := self.providers.get(provider_type):
-                try:
-                    result = provider.synthesize(text, voice_id, self.config)
-                    logger.info(f"Successfully synthesized with {provider_type.value}")
-                    return result
-                except Exception as e:
-                    logger.error(f"{provider_type.value} synthesis failed: {e}")
+    async def _first_tts(
+        self, text: str, voice_id: str, attempts: list[tuple[str, str]]
+    ) -> tuple[ProviderType, bytes, AsyncGenerator[bytes, None]] | None:
+        """First provider in order to produce a chunk within the timeout.
 
-        logger.error("All TTS providers failed or unavailable")
+        Fallbacks are only constructed and called once the providers before them fail.
+        """
+        for provider_type, provider in self._tts_providers():
+            stream = provider.synthesize(text, voice_id, self.config)
+            try:
+                first_chunk = await asyncio.wait_for(anext(stream), self.config.tts_timeout)
+            except Exception as e:
+                attempts.append((provider_type.value, repr(e)))
+                await stream.aclose()
+                continue
+            return provider_type, first_chunk, stream
         return None
 
-    def get_available_voices(self) -> dict[str, Any]:
-        """Get list of available voices from all providers."""
+    async def _race_tts(
+        self,
+        streams: dict[ProviderType, AsyncGenerator[bytes, None]],
+        attempts: list[tuple[str, str]],
+    ) -> tuple[ProviderType, bytes, AsyncGenerator[bytes, None]] | None:
+        """Provider that produces a chunk first, with all of them started together."""
+        tasks = {
+            asyncio.create_task(asyncio.wait_for(anext(stream), self.config.tts_timeout)): (
+                provider_type,
+                stream,
+            )
+            for provider_type, stream in streams.items()
+        }
+
+        opened = None
+        try:
+            pending = set(tasks)
+            while pending and opened is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider_type, stream = tasks[task]
+                    if error := task.exception():
+                        attempts.append((provider_type.value, repr(error)))
+                    elif opened is None:
+                        opened = provider_type, task.result(), stream
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Streams can only be closed once their pending read has been cancelled
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for _, stream in tasks.values():
+                if opened is None or stream is not opened[2]:
+                    await stream.aclose()
+
+        return opened
+
+    async def synthesize_speech_bytes(
+        self, text: str, voice_id: str | None = None
+    ) -> bytes | None:
+        """Convert text to speech and return the whole clip, or None if no provider could."""
+        clip: list[bytes] = []
+        async for _ in self._synthesize(text, voice_id, False, clip):
+            pass
+        return clip[0] if clip else None
+
+    async def get_available_voices(self) -> dict[str, Any]:
+        """Get list of available voices from all providers, cached for _VOICES_TTL seconds."""
+        if self._voices_cache and time.monotonic() - self._voices_cache[0] < _VOICES_TTL:
+            return self._voices_cache[1]
+
+        complete = True
         voices = {
             "mr_barnard": {"name": "Mr. Barnard", "provider": "multiple"},
             "british_male": {"name": "British Male", "provider": "multiple"},
         }
 
         # Add ElevenLabs voices if available
-        if elevenlabs_provider := self.providers.get(ProviderType.ELEVENLABS):
+        elevenlabs_provider = self._get(ProviderType.ELEVENLABS)
+        if isinstance(elevenlabs_provider, ElevenLabsProvider):
             try:
-                elevenlabs_voices = elevenlabs_provider.client.voices.get_all()
-                for voice in elevenlabs_voices.voices:
-                    voices[voice.voice_id] = {
-                        "name": voice.name,
-                        "provider": "elevenlabs",
-                        "category": getattr(voice, "category", "custom"),
-                    }
+                voices.update(await elevenlabs_provider.list_voices())
             except Exception as e:
-                logger.warning(f"Failed to get ElevenLabs voices: {e}")
+                complete = False
+                logger.warning("Failed to get ElevenLabs voices: %s", e)
 
+        # A failed fetch is not cached, so the next call tries again
+        if complete:
+            self._voices_cache = (time.monotonic(), voices)
         return voices
 
+    def refresh_voices(self) -> None:
+        """Drop the cached voice list so the next request fetches it again."""
+        self._voices_cache = None
+
     def is_available(self) -> bool:
         """Check if any voice services are available."""
-        return len(self.providers) > 0
+        return bool(self._provider_factories)
+
+    def can_synthesize(self) -> bool:
+        """Check if any TTS provider could synthesize a reply."""
+        return self._any_tts
 
     def get_status(self) -> dict[str, bool]:
         """Get status of all voice service providers."""
         return {
-            "openai_stt": ProviderType.OPENAI in self.providers,
-            "openai_tts": ProviderType.OPENAI in self.providers,
-            "elevenlabs_tts": ProviderType.ELEVENLABS in self.providers,
-            "google_stt": ProviderType.GOOGLE in self.providers,
-            "google_tts": ProviderType.GOOGLE in self.providers,
+            "openai_stt": ProviderType.OPENAI in self._provider_factories,
+            "openai_tts": ProviderType.OPENAI in self._provider_factories,
+            "elevenlabs_tts": ProviderType.ELEVENLABS in self._provider_factories,
+            "google_stt": ProviderType.GOOGLE in self._provider_factories,
+            "google_tts": ProviderType.GOOGLE in self._provider_factories,
         }
 
     def get_provider_capabilities(self) -> dict[str, list[str]]:
-        """Get capabilities of each provider."""
-        capabilities = {}
-
-        for provider_type, provider in self.providers.items():
-            caps = []
-            try:
-                provider.transcribe(b"", "wav")
-                caps.append("transcription")
-            except (NotImplementedError, Exception):
-                pass
-
-            try:
-                provider.synthesize("test", "test", self.config)
-                caps.append("synthesis")
-            except Exception:
-                pass
-
-            capabilities[provider_type.value] = caps
-
-        return capabilities
+        """Get capabilities of each configured provider."""
+        return {
+            provider_type.value: _PROVIDER_CAPABILITIES[provider_type]
+            for provider_type in self._provider_factories
+        }
 
 
-# Global voice service instance
-voice_service = VoiceService()
+@lru_cache(maxsize=1)
+def get_voice_service() -> VoiceService:
+    """Voice service instance, created on first use rather than at import."""
+    return VoiceService()
@@ -91,6 +91,7 @@ interface Message {
   cacheHit?: boolean;
   audioUrl?: string;
   isVoice?: boolean;
+  responseId?: number;
 }
 
 interface Metrics {
@@ -136,6 +137,7 @@ function App() {
   const BASE_DELAY = 1000; // 1s
   const wsRetryCount = useRef(0);
   const wsReconnectTimeout = useRef<NodeJS.Timeout | null>(null);
+  const pendingAudioResponseId = useRef<number | null>(null);
   
   // Derived states for backward compatibility
   const isLoading = recordingState === "processing";
@@ -150,6 +152,31 @@ function App() {
   const chatContainerRef = useRef<HTMLDivElement>(null);
   const wsRef = useRef<WebSocket | null>(null);
   const wsErrorTimeoutRef = useRef<NodeJS.Timeout | null>(null);
+  // Object URLs of every TTS clip created, and of those the conversation last showed
+  const audioUrlsRef = useRef<Set<string>>(new Set());
+  const shownAudioUrlsRef = useRef<Set<string>>(new Set());
+
+  // Revoke clips whose message was replaced or removed since the last commit
+  useEffect(() => {
+    const shown = new Set<string>();
+    conversation.forEach(message => message.audioUrl && shown.add(message.audioUrl));
+    shownAudioUrlsRef.current.forEach(url => {
+      if (!shown.has(url)) {
+        URL.revokeObjectURL(url);
+        audioUrlsRef.current.delete(url);
+      }
+    });
+    shownAudioUrlsRef.current = shown;
+  }, [conversation]);
+
+  // Release every clip, shown or not, when the component unmounts
+  useEffect(() => {
+    const audioUrls = audioUrlsRef.current;
+    return () => {
+      audioUrls.forEach(url => URL.revokeObjectURL(url));
+      audioUrls.clear();
+    };
+  }, []);
 
   // Initialize WebSocket connection on component mount
   useEffect(() => {
@@ -222,18 +249,16 @@ function App() {
         processingTimeoutRef.current = null;
       }, 10000); // 10 second backup timeout
 
-      // Convert audio blob to base64 for WebSocket transmission (optimized)
-      const base64Audio = await convertBlobToBase64(audioBlob);
-
-      // Send via WebSocket
-      const message = {
+      // Send a small JSON header followed by the raw audio as a binary frame
+      const header = {
         type: 'voice_input',
-        audio_data: base64Audio,
+        format: 'webm',
         session_id: sessionId
       };
 
       if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
-        wsRef.current.send(JSON.stringify(message));
+        wsRef.current.send(JSON.stringify(header));
+        wsRef.current.send(audioBlob);
       } else {
         handleError("websocket", "WebSocket not connected. Cannot send voice message.");
       }
@@ -314,6 +339,22 @@ function App() {
     setConversation(prev => [...prev, message]);
   }, []);
 
+  // TTS audio arrives as a binary frame right after an audio_chunk header
+  const attachAudioToResponse = useCallback((audio: Blob, responseId: number | null) => {
+    const audioUrl = URL.createObjectURL(new Blob([audio], { type: "audio/mpeg" }));
+    audioUrlsRef.current.add(audioUrl);
+    setConversation(prev => {
+      for (let i = prev.length - 1; i >= 0; i--) {
+        if (prev[i].type === "ai" && (responseId === null || prev[i].responseId === responseId)) {
+          const updated = [...prev];
+          updated[i] = { ...prev[i], audioUrl };
+          return updated;
+        }
+      }
+      return prev;
+    });
+  }, []);
+
   // Unified error handler
   const handleError = useCallback((type: AppError["type"], message: string) => {
     console.error(`[${type}] ${message}`);
@@ -338,19 +379,6 @@ function App() {
     [handleError]
   );
   
-  // Optimized audio processing pipeline
-  const convertBlobToBase64 = useCallback((blob: Blob): Promise<string> => {
-    return new Promise(resolve => {
-      const reader = new FileReader();
-      reader.onloadend = () => {
-        const base64String = (reader.result as string).split(",")[1];
-        resolve(base64String);
-      };
-      reader.readAsDataURL(blob);
-    });
-  }, []);
-
-
   // WebSocket functions with exponential backoff
   const connectWebSocket = useCallback(() => {
     if (wsRef.current?.readyState === WebSocket.OPEN) {
@@ -392,6 +420,12 @@ function App() {
       };
     
     ws.onmessage = (event) => {
+      if (event.data instanceof Blob) {
+        attachAudioToResponse(event.data, pendingAudioResponseId.current);
+        pendingAudioResponseId.current = null;
+        return;
+      }
+
       try {
         const data = JSON.parse(event.data);
         console.log(`🔄 WebSocket message received: ${data.type}`, data);
@@ -415,6 +449,13 @@ function App() {
             processingTimeoutRef.current = null;
           }
           
+          // Voice turns carry the transcription in the same envelope
+          if (data.transcribed_text) {
+            addMessageToConversation(
+              createMessage("user", data.transcribed_text, { isVoice: true })
+            );
+          }
+
           // For WebSocket, calculate response time from message sending to receiving
           const responseTime = data.response_time_ms || 0;
           addMessageToConversation(
@@ -423,7 +464,7 @@ function App() {
               responseTime,
               cacheHit: false,
               isVoice: data.is_voice || false,
-              audioUrl: data.audio_url || undefined,
+              responseId: data.response_id,
             })
           );
           if (responseTime > 0) {
@@ -432,6 +473,8 @@ function App() {
           setCurrentState(data.current_node || "Unknown");
           setRecordingState("idle");
           console.log('✅ Recording state reset to idle after AI response');
+        } else if (data.type === 'audio_chunk') {
+          pendingAudioResponseId.current = data.response_id ?? null;
         } else if (data.type === 'error') {
           console.log('❌ Error received, setting state to error');
           addErrorMessage(data.content);
@@ -478,7 +521,7 @@ function App() {
     } else {
       connectAttempt();
     }
-  }, [addMessageToConversation, createMessage, handleError, updateMetrics, appError]);
+  }, [addMessageToConversation, attachAudioToResponse, createMessage, handleError, updateMetrics, appError]);
 
   const disconnectWebSocket = useCallback(() => {
     // Clear reconnection attempts